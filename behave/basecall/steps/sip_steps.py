@@ -17,9 +17,10 @@ from assertpy import assert_that
 
 # pylint: disable=E0401,E0102,C0413,W0108
 #from pysiptest.rtpecho import RtpEcho
-from pysiptest.rtpplay import RtpPlay
+from pysiptest.rtpplay import RtpPlay, read_pcap
 from pysiptest import sipmsg
 from pysiptest import headerfield as hf
+from pysiptest import support
 
 from behave import given, then, step    # pylint: disable=E0611
 from behave.api.async_step import \
@@ -30,19 +31,24 @@ from behave.api.async_step import \
 
 async def wait_for_response(protocol, expected_codes):
     '''Wait for a response, and assert its value.'''
+    pending = []
     if not protocol.wait.done():
-        response = await protocol.rcv_queue.get()
-    while response is not None:
+        pending = await support.drain_at_least(protocol.rcv_queue)
+    while pending:
+        response = pending.pop(0)
         logging.debug('wait_for_response: received %s', sipmsg.Response.get_code(response))
         code = int(sipmsg.Response.get_code(response))
-        if code in expected_codes:
-            return response
-        assert_that(code).described_as('response').is_less_than(300)
-        if code >= 200:
+        if code in expected_codes or code >= 200:
             break
-        if not protocol.wait.done():
-            response = await protocol.rcv_queue.get()
-
+        if not pending and not protocol.wait.done():
+            pending = await support.drain_at_least(protocol.rcv_queue)
+
+    # Anything drained past this response belongs to later steps
+    for item in pending:
+        protocol.rcv_queue.put_nowait(item)
+    if code in expected_codes:
+        return response
+    assert_that(code).described_as('response').is_less_than(300)
     assert_that(sipmsg.Response.get_code(response)).is_in(*expected_codes)
     return response
 
@@ -95,29 +101,25 @@ async def step_impl(context, caller, receiver):
     user_protocol = context.sip_xport[caller][1]
 
     # Create RTP playback endpoint
+    pcap_data = await read_pcap(context.udp_transport.loop, 'sipp_call.pcap')
     _, protocol = await context.udp_transport.loop.create_datagram_endpoint(
         lambda: RtpPlay(context.udp_transport.loop, on_con_lost=None,
-            file_name='sipp_call.pcap'),
+            data=pcap_data),
         local_addr=(context.test_host, 0)) # server mode
     user_protocol.rtp_endpoint = protocol
 
-    logging.debug('calls %s, %s: wait=loop.create_future()', caller, receiver)
-    user_protocol.wait = context.udp_transport.loop.create_future()
+    logging.debug('calls %s, %s', caller, receiver)
     if receiver in context.test_users:
-        user_protocol.dial(context.test_users[receiver])
+        recipient = context.test_users[receiver]
     else:
-        extension = {
+        recipient = {
         'domain': 'teo',
         'name': 'NoneGiven',
         'extension': receiver,
         'sipuri': f'sip:{receiver}@teo'}
-        user_protocol.dial(extension)
     # Wait for call to complete
-    if not user_protocol.wait.done():
-        await user_protocol.wait
-    assert_that(user_protocol.wait.result())\
+    assert_that(await user_protocol.call(recipient))\
         .described_as('__ calls __').is_true()
-    user_protocol.wait = None
 
 @then('"{from_name}" transfers to "{to_name_uri}"')
 @async_run_until_complete(async_context='udp_transport')
@@ -147,8 +149,7 @@ def refer_from_ack(refer_to:str, ack_msg:str, user_protocol):
         request_uri=ack_hdrs.getfield('Contact')[0].strip('<>'),
         transport='UDP')
     refer_msg.init_mandatory()
-    refer_msg.field('Via').via_params['address'] = \
-            f"{user_protocol.local_addr[0]}:{user_protocol.local_addr[1]}"
+    refer_msg.field('Via').via_params['address'] = user_protocol.local_addr
     refer_msg.field('Via').via_params['transport'] = refer_msg.transport
     refer_msg.field('From').from_string(ack_hdrs.getfield('To')[0])
     refer_msg.field('To').from_string(ack_hdrs.getfield('From')[0])
@@ -159,7 +160,6 @@ def refer_from_ack(refer_to:str, ack_msg:str, user_protocol):
     refer_msg.field('Contact').value = contact
     refer_msg.field('Referred_By').value = contact
     refer_msg.field('Refer_To').value = refer_to
-    refer_msg.sort()
     return refer_msg
 
 @step('"{name}" expects a call')
@@ -169,11 +169,12 @@ async def step_impl(context, name):
     logging.debug('expects a call %s: wait=loop.create_future', name)
     user_protocol.wait = context.udp_transport.loop.create_future()
     async_context = use_or_create_async_context(context, 'udp_transport')
+    pcap_data = await read_pcap(async_context.loop, 'sipp_call.pcap')
     _, protocol = \
         await context.udp_transport.loop.create_datagram_endpoint(
             # or RtpEcho
             lambda: RtpPlay(async_context.loop, on_con_lost=None,
-                file_name='sipp_call.pcap'),
+                data=pcap_data),
             local_addr=(context.test_host, 0)) # server mode
 
     user_protocol.rtp_endpoint = protocol
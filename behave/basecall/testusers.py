@@ -1,6 +1,7 @@
 # vim: set ai ts=4 sw=4 expandtab:
 
 '''Test data for Behave test steps.'''
+from pysiptest._constants import DEFAULT_USER_AGENT
 from pysiptest.sipphone import AutoAnswer
 
 TEST_HOST = '192.168.1.115'
@@ -20,7 +21,7 @@ TEST_USERS = {
         'header_fields': {
             'Session-Expires': '1800',
             'Min-SE': '1800',
-            'User-Agent': 'pysip/123456_DEADBEEFCAFE'}},
+            'User-Agent': DEFAULT_USER_AGENT}},
     'Bob1': {
         'domain': 'teo',
         'name': 'Bob',
@@ -32,7 +33,7 @@ TEST_USERS = {
         'header_fields': {
             'Session-Expires': '1800',
             'Min-SE': '1800',
-            'User-Agent': 'pysip/123456_DEADBEEFCAFE'}},
+            'User-Agent': DEFAULT_USER_AGENT}},
     'Charlie1': {
         'domain': 'teo',
         'name': 'Charlie',
@@ -42,7 +43,7 @@ TEST_USERS = {
         'server': None,
         'transport': None,
         'header_fields': {
-            'User-Agent': 'pysip/123456_DEADBEEFCAFE'}},
+            'User-Agent': DEFAULT_USER_AGENT}},
     'H100': { # Hunt
         'domain': 'teo',
         'name': 'H100',
@@ -52,7 +53,7 @@ TEST_USERS = {
         'server': None,
         'transport': None,
         'header_fields': {
-            'User-Agent': 'pysip/123456_DEADBEEFCAFE'}},
+            'User-Agent': DEFAULT_USER_AGENT}},
     'A200': { # Auto Attendant
         'domain': 'teo',
         'name': 'A200',
@@ -62,4 +63,4 @@ TEST_USERS = {
         'server': None,
         'transport': None,
         'header_fields': {
-            'User-Agent': 'pysip/123456_DEADBEEFCAFE'}}}
+            'User-Agent': DEFAULT_USER_AGENT}}}
@@ -8,6 +8,7 @@ from behave.api.async_step import use_or_create_async_context
 
 import os
 import sys
+from pysiptest import support
 from pysiptest.sipphone import AutoAnswer, AutoReply
 
 TEST_HOST = '192.168.0.143'
@@ -76,7 +77,7 @@ def udp_transport(context):
     async_context = use_or_create_async_context(context, 'udp_transport')
 
     # Create the task for the client
-    for user_name in TEST_USERS.keys():
+    for user_name in TEST_USERS:
         logging.debug('fixture udp_transport, user_name=%s', user_name)
         task = async_context.loop.create_task(
             init_transport(context, async_context,
@@ -107,9 +108,13 @@ def test_servers(context):
     context.test_servers = TEST_SERVERS
     yield context.test_servers
 
+def before_all(context): # pylint: disable=W0613
+    '''Opt in to uvloop for the event loop, when it is installed.'''
+    support.use_uvloop()
+
 def before_scenario(context, scenario):
     '''Set up test context and skip marked scenarios.'''
-    # Skip all scenarios tagged with @skip
+    # Skip all scenarios tagged with @skip, when not excluded by behave.ini
     if "skip" in scenario.effective_tags:
         scenario.skip('Marked with @skip')
         return
@@ -6,8 +6,8 @@ import copy
 import logging
 
 # pylint: disable=E0401,E0102,C0413
-from pysiptest.rtpecho import RtpEcho
-from pysiptest.rtpplay import RtpPlay
+from pysiptest.rtpecho import create_echo_endpoint
+from pysiptest.rtpplay import RtpPlay, read_pcap
 
 import pysiptest.headerfield as hf
 from pysiptest import sipmsg
@@ -47,18 +47,16 @@ async def step_impl(context, caller, receiver):
     user_protocol = context.sip_xport[caller][1]
 
     # Create RTP playback endpoint
+    pcap_data = await read_pcap(
+        context.udp_transport.loop, 'sipp_call.pcap')
     _, protocol = await context.udp_transport.loop.create_datagram_endpoint(
         lambda: RtpPlay(context.udp_transport.loop, on_con_lost=None,
-            file_name='/home/bmiller/sipp_call.pcap'),
+            data=pcap_data),
         local_addr=(context.test_host, 0)) # server mode
     user_protocol.rtp_endpoint = protocol
 
-    user_protocol.wait = context.udp_transport.loop.create_future()
-    user_protocol.dial(context.test_users[receiver])
     # Wait for call to complete
-    await user_protocol.wait
-    assert user_protocol.wait.result() is True
-    user_protocol.wait = None
+    assert await user_protocol.call(context.test_users[receiver]) is True
 
 @step('"{name}" waits for a call')
 @async_run_until_complete(async_context='udp_transport')
@@ -66,10 +64,8 @@ async def step_impl(context, name):
     user_protocol = context.sip_xport[name][1]
     user_protocol.wait = context.udp_transport.loop.create_future()
     async_context = use_or_create_async_context(context, 'udp_transport')
-    _, protocol = \
-        await context.udp_transport.loop.create_datagram_endpoint(
-            lambda: RtpEcho(async_context.loop, on_con_lost=None),
-            local_addr=(context.test_host, 0)) # server mode
+    _, protocol = create_echo_endpoint(
+        async_context.loop, (context.test_host, 0)) # server mode
 
     user_protocol.rtp_endpoint = protocol
     # SipPhone state machine should now be primed for INVITE
@@ -123,7 +119,6 @@ async def step_impl(context, receiver, caller, park_ext):
     sent_sdp_msg = [m for m in user_protocol.sent_msgs if m.body is not None]
     sdp_body = copy.copy(sent_sdp_msg[-1].body)
     park_invite.body = sdp_body.replace('sendrecv', 'sendonly')
-    park_invite.sort()
     user_protocol.sendto(park_invite)
 
     # Wait for 200
@@ -184,18 +179,16 @@ async def step_impl(context, dest_user, caller, park_sipaddr):
     user_protocol = context.sip_xport[dest_user][1]
 
     # Create RTP playback endpoint
+    pcap_data = await read_pcap(
+        context.udp_transport.loop, 'sipp_call.pcap')
     _, protocol = await context.udp_transport.loop.create_datagram_endpoint(
         lambda: RtpPlay(context.udp_transport.loop, on_con_lost=None,
-            file_name='/home/bmiller/sipp_call.pcap'),
+            data=pcap_data),
         local_addr=(context.test_host, 0)) # server mode
     user_protocol.rtp_endpoint = protocol
 
-    user_protocol.wait = context.udp_transport.loop.create_future()
-    user_protocol.dial(park_ext)
     # Wait for call to complete
-    await user_protocol.wait
-    assert user_protocol.wait.result() is True
-    user_protocol.wait = None
+    assert await user_protocol.call(park_ext) is True
 
 @then('"{name}" hangs up')
 @async_run_until_complete(async_context='udp_transport')
@@ -2,12 +2,14 @@
 
 '''Test environment setup for Behave test steps.'''
 
+import asyncio
 import csv
 import logging
 import os
 from behave import fixture, use_fixture
 from behave.api.async_step import use_or_create_async_context
 
+from pysiptest import support
 from pysiptest.sipphone import AutoAnswer, AutoReply
 import testdata as td
 
@@ -133,9 +135,13 @@ def before_tag(context, tag):
         assert os.path.isfile(import_file_name)
         import_init_transport(context, import_file_name)
 
+def before_all(context): # pylint: disable=W0613
+    '''Opt in to uvloop for the event loop, when it is installed.'''
+    support.use_uvloop()
+
 def before_scenario(context, scenario):
     '''Set up test context and skip marked scenarios.'''
-    # Skip all scenarios tagged with @skip
+    # Skip all scenarios tagged with @skip, when not excluded by behave.ini
     if 'skip' in scenario.effective_tags:
         scenario.skip('Marked with @skip')
         return
@@ -153,8 +159,6 @@ def before_feature(context, feature): # pylint: disable=W0613
 def after_feature(context, feature):
     '''Unregister users after feature completed.'''
     async_context = use_or_create_async_context(context, 'udp_transport')
-    for user_name in td.TEST_USERS:
-        logging.debug('fixture udp_transport, user_name=%s', user_name)
-        task = async_context.loop.create_task(
-            unregister_user(context, user_name))
-        async_context.loop.run_until_complete(task)
+    # Users are independent, unregister them concurrently
+    async_context.loop.run_until_complete(asyncio.gather(
+        *(unregister_user(context, user_name) for user_name in td.TEST_USERS)))
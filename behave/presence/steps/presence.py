@@ -12,13 +12,12 @@
 #           obsoleted by 6665
 
 from asyncio import sleep
-import copy
 import logging
 from assertpy import assert_that
 
 # pylint: disable=E0401,E0102,C0413
-from pysiptest.rtpecho import RtpEcho
-from pysiptest.rtpplay import RtpPlay
+from pysiptest.rtpecho import create_echo_endpoint
+from pysiptest.rtpplay import RtpPlay, read_pcap
 import pysiptest.headerfield as hf
 from pysiptest import sipmsg
 from pysiptest import support
@@ -34,17 +33,22 @@ from mass_presence import ext2name
 
 async def wait_for_response(protocol, expected_codes):
     '''Wait for a response, and assert its value.'''
-    response = await protocol.rcv_queue.get()
-    while response is not None:
+    pending = await support.drain_at_least(protocol.rcv_queue)
+    while pending:
+        response = pending.pop(0)
         logging.debug('wait_for_response: received %s', sipmsg.Response.get_code(response))
         code = int(sipmsg.Response.get_code(response))
-        if code in expected_codes:
-            return response
-        assert_that(code).described_as('response').is_less_than(300)
-        if code >= 200:
+        if code in expected_codes or code >= 200:
             break
-        response = await protocol.rcv_queue.get()
-
+        if not pending:
+            pending = await support.drain_at_least(protocol.rcv_queue)
+
+    # Anything drained past this response belongs to later steps
+    for item in pending:
+        protocol.rcv_queue.put_nowait(item)
+    if code in expected_codes:
+        return response
+    assert_that(code).described_as('response').is_less_than(300)
     assert_that(sipmsg.Response.get_code(response)).is_in(*expected_codes)
     return response
 
@@ -78,19 +82,16 @@ async def step_impl(context, caller, receiver):
     user_protocol = context.sip_xport[caller][1]
 
     # Create RTP playback endpoint
+    pcap_data = await read_pcap(context.udp_transport.loop, 'sipp_call.pcap')
     _, protocol = await context.udp_transport.loop.create_datagram_endpoint(
         lambda: RtpPlay(context.udp_transport.loop, on_con_lost=None,
-            file_name='sipp_call.pcap'),
+            data=pcap_data),
         local_addr=(context.test_host, 0)) # server mode
     user_protocol.rtp_endpoint = protocol
 
-    user_protocol.wait = context.udp_transport.loop.create_future()
-    user_protocol.dial(context.test_users[receiver])
     # Wait for call to complete
-    await user_protocol.wait
-    assert_that(user_protocol.wait.result())\
+    assert_that(await user_protocol.call(context.test_users[receiver]))\
         .described_as('__ calls __').is_true()
-    user_protocol.wait = None
 
 @step('"{name}" waits for a call')
 @async_run_until_complete(async_context='udp_transport')
@@ -98,10 +99,8 @@ async def step_impl(context, name):
     user_protocol = context.sip_xport[name][1]
     user_protocol.wait = context.udp_transport.loop.create_future()
     async_context = use_or_create_async_context(context, 'udp_transport')
-    _, protocol = \
-        await context.udp_transport.loop.create_datagram_endpoint(
-            lambda: RtpEcho(async_context.loop, on_con_lost=None),
-            local_addr=(context.test_host, 0)) # server mode
+    _, protocol = create_echo_endpoint(
+        async_context.loop, (context.test_host, 0)) # server mode
 
     user_protocol.rtp_endpoint = protocol
     # SipPhone state machine should now be primed for INVITE
@@ -203,7 +202,7 @@ async def step_impl(context, name, user_or_uri):
     logging.debug('subscribes to: response, status=%s', response_status)
 
     if response_status == '407':
-        subscribe_auth = copy.copy(subscribe_sub)
+        subscribe_auth = subscribe_sub.clone()
         # RFC 8760 -- there may be more than one Authenticate
         proxy_authenticate = rfields.getfield('Proxy-Authenticate')[0]
         context.test_users[name]['subscriptions'][user_or_uri] = \
@@ -219,7 +218,6 @@ async def step_impl(context, name, user_or_uri):
                 proxy_authenticate,
                 subscribe_auth.method, context.test_users[name], uri=sip_auth_uri)))
         subscribe_auth.field('CSeq').value = user_protocol.cseq_out_of_dialog
-        subscribe_auth.sort()
         user_protocol.sendto(subscribe_auth)
         await wait_for_response(user_protocol, [202])
     assert user_or_uri in \
@@ -305,7 +303,7 @@ async def step_impl(context, name, user_or_uri):
     logging.debug('__ unsubscribes from __: response, status=%s', response_status)
     # RFC 8760 - there may be more than one authenticate
     if response_status == '407':
-        unsub_auth = copy.copy(presence_unsub)
+        unsub_auth = presence_unsub.clone()
         sip_auth_uri = f"sip:{context.test_users[name]['domain']}"
         logging.debug('challenge=%s, request_method=%s, userinfo:%s, uri=%s',
                 rfields.getfield('Proxy-Authenticate')[0],
@@ -315,7 +313,6 @@ async def step_impl(context, name, user_or_uri):
                 rfields.getfield('Proxy-Authenticate')[0],
                 unsub_auth.method, context.test_users[name], uri=sip_auth_uri)))
         unsub_auth.field('CSeq').value = user_protocol.cseq_out_of_dialog
-        unsub_auth.sort()
         user_protocol.sendto(unsub_auth)
         await wait_for_response(user_protocol, [202])
 
@@ -346,7 +343,6 @@ async def step_impl(context, name, state):
     # First PUBLISH will have no SIP-ETag value for SIP_If_Match
     if hasattr(context, 'SIP_ETag'):
         publish.hdr_fields.append(hf.SIP_If_Match(value=context.SIP_ETag))
-        publish.sort()
     logging.debug('__ sets presence to __: publish=%s', str(publish))
     user_protocol.sendto(publish)
 
@@ -2,11 +2,12 @@
 
 '''Test environment setup for Behave test steps.'''
 
+from functools import partial
 import logging
 from behave import fixture, use_fixture
 from behave.api.async_step import use_or_create_async_context
 
-#sys.path.append(os.getenv('PYSIP_LIB_PATH'))
+from pysiptest import support
 from pysiptest.sipphone import AutoAnswer, AutoReply
 from pysiptest.digestauth import SipDigestAuth
 
@@ -51,7 +52,7 @@ async def init_transport(
         user_name, user_info['server'])
     transport, protocol = \
         await async_context.loop.create_datagram_endpoint(
-            lambda: user_info['transport'](
+            partial(user_info['transport'],
                 user_info=user_info,
                 loop=async_context.loop),
             remote_addr=TEST_SERVERS[user_info['server']])
@@ -101,9 +102,13 @@ def test_servers(context):
     context.test_servers = TEST_SERVERS
     yield context.test_servers
 
+def before_all(context): # pylint: disable=W0613
+    '''Opt in to uvloop for the event loop, when it is installed.'''
+    support.use_uvloop()
+
 def before_scenario(context, scenario):
     '''Set up test context and skip marked scenarios.'''
-    # Skip all scenarios tagged with @skip
+    # Skip all scenarios tagged with @skip, when not excluded by behave.ini
     if "skip" in scenario.effective_tags:
         scenario.skip('Marked with @skip')
         return
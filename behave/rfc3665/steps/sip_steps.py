@@ -4,7 +4,6 @@ Behave steps to for Feature: Registration, RFC 3665, Section 2
 '''
 
 from asyncio import sleep
-import copy
 import logging
 from assertpy import assert_that
 
@@ -68,23 +67,18 @@ async def step(context, user_name, codes): # pylint: disable=W0613
     sip_msg = await context.sip_xport[user_name][1].rcv_queue.get()
 
     # pylint: disable=C0209
-    assert_that(sipmsg.Response.get_code(sip_msg))\
-        .described_as('%s response %s'
-        % (user_name, sip_msg.split(maxsplit=1)[0]))\
-        .is_not_none()
-    assert_that(codes).described_as('response').contains(sipmsg.Response.get_code(sip_msg))
-    context.pending_msg = copy.deepcopy(
-        context.sip_xport[user_name][1].sent_msgs[-1])
+    first_line = sipmsg.SipMessage.first_line(sip_msg)
+    assert_that(first_line).described_as('%s start line' % user_name).is_not_none()
+    assert_that(first_line[0])\
+        .described_as('%s response %s' % (user_name, first_line[0]))\
+        .is_equal_to('SIP/2.0')
+    assert_that(codes).described_as('response').contains(first_line[1])
+    context.pending_msg = context.sip_xport[user_name][1].sent_msgs[-1].clone()
 
 @when('with header field "{field_name}" value "{field_value}"')
 def step(context, field_name, field_value): # pylint: disable=W0613
     assert context.pending_msg is not None
-    field_name = field_name.replace('-', '_')
-    field = context.pending_msg.field(field_name)
-    if field is None:
-        field = hf.by_name(field_name)() # by_name returns class
-        context.pending_msg.hdr_fields.append(field)
-    context.pending_msg.field(field_name).from_string(field_value)
+    context.pending_msg.upsert_field(field_name, field_value)
 
 @when('with Contact field expires 0')
 def step(context):
@@ -98,7 +92,8 @@ def step(context):
 def step(context, user_name):
     assert context.pending_msg is not None
     assert len(context.sip_xport[user_name][1].recvd_pkts) > 0
-    sip_dict = hf.HeaderFieldValues(context.sip_xport[user_name][1].recvd_pkts[-1])
+    user_protocol = context.sip_xport[user_name][1]
+    sip_dict = user_protocol.fields_of(user_protocol.recvd_pkts[-1])
     assert 'WWW-Authenticate' in sip_dict.field_names
     # RFC 8760 -- There may be more than one WWW-Authenticate
     www_authenticate = sip_dict.getfield('WWW-Authenticate')[0]
@@ -110,7 +105,6 @@ def step(context, user_name):
 
     # New transaction, increment CSeq
     context.pending_msg.field('CSeq').value += 1
-    context.pending_msg.sort()
 
 @when('without header field "{header_field}"')
 def step(context, header_field): # pylint: disable=W0613
@@ -129,22 +123,21 @@ def step(context, user_name): # pylint: disable=W0613
 
 @then('"{user_name}" response contains "{field_name}" field, value "{field_value}"')
 def step(context, user_name, field_name, field_value): # pylint: disable=W0613
-    fields = hf.HeaderFieldValues(context.sip_xport[user_name][1].recvd_pkts[-1])
+    user_protocol = context.sip_xport[user_name][1]
+    fields = user_protocol.fields_of(user_protocol.recvd_pkts[-1])
     assert_that(fields.field_names).contains(field_name)
     assert_that(fields.getfield(field_name)[0]).contains(field_value)
 
 @then('"{user_name}" response does not contain field "{header_field}"')
 def step(context, user_name, header_field): # pylint: disable=W0613
-    fields = hf.HeaderFieldValues(context.sip_xport[user_name][1].recvd_pkts[-1])
+    user_protocol = context.sip_xport[user_name][1]
+    fields = user_protocol.fields_of(user_protocol.recvd_pkts[-1])
     assert_that(fields.field_names).does_not_contain(header_field)
 
 @when('"{user_name}" Contact field port is set to {portnum}')
 def step(context, user_name, portnum):
     assert context.invite_msg is not None
-    extension = context.test_users[user_name]["extension"]
-    addr = context.sip_xport[user_name][1].local_addr
-    context.invite_msg.field('Contact').from_string(
-        f'<sip:{extension}@{addr[0]}:{portnum}>')
+    context.invite_msg.field('Contact').set_port(portnum)
 
 @then('"{user_name}" receives "{method}"')
 @async_run_until_complete(async_context='udp_datagram')
@@ -158,7 +151,6 @@ async def step(context, user_name, method):
     response = sipmsg.Response(status_code=200, reason_phrase='OK')
     response.method = method
     response.init_from_msg(req_msg)
-    response.sort()
     context.sip_xport[user_name][1].sendto(response)
     assert_that(context.sip_xport[user_name][1].in_a_call).is_false()
 
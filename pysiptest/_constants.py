@@ -0,0 +1,9 @@
+# vim: ai ts=4 sw=4 et
+'''
+Default header field values shared by message builders and test data.
+'''
+
+ALLOW_METHODS = \
+    'ACK, BYE, CANCEL, INFO, INVITE, MESSAGE, NOTIFY, OPTIONS, REFER, SUBSCRIBE, UPDATE'
+SUPPORTED_DEFAULT = 'eventlist, replaces, callerid'
+DEFAULT_USER_AGENT = 'pysip/123456_DEADBEEFCAFE'
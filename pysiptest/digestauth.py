@@ -17,11 +17,29 @@ import urllib.request
 import urllib.error
 import urllib.parse
 
+# Digest values are protocol hashes, not security use; Python 3.8 has no
+# usedforsecurity keyword.
+try:
+    hashlib.md5(usedforsecurity=False)
+    _HASH_KWARGS = {'usedforsecurity': False}
+except TypeError:
+    _HASH_KWARGS = {}
+
+def _hexdigest(hash_name):
+    """ Hash function for algorithm, taking and returning str. """
+    constructor = getattr(hashlib, hash_name)
+    return lambda d: constructor(d.encode('ascii'), **_HASH_KWARGS).hexdigest()
+
+_MD5 = _hexdigest('md5')
+_SHA256 = _hexdigest('sha256')
+_SHA512 = _hexdigest('sha512')
+
 class SipDigestAuth():
     """ Provide digest authentication for SIP authentication challenge. """
     def __init__(self):
         self.__A1 = None
         self.__H = None
+        self.__HA1 = (None, None)   # last (algorithm, A1) and its H(A1)
         self._force_nonce = None # Change nonce value for tests
         self.nonce_count = 0
         self.cnonce = None
@@ -71,16 +89,16 @@ class SipDigestAuth():
         # qop-value         = "auth" | "auth-int" | token
         _, challenge = challenge.split(' ', 1)
         self.challenge = urllib.request.parse_keqv_list(urllib.request.parse_http_list(challenge))
-        if 'algorithm' not in list(self.challenge.keys()):
+        if 'algorithm' not in self.challenge:
             self.challenge['algorithm'] = 'MD5'
 
         # RFC 7616
         if 'MD5' in self.challenge['algorithm']:
-            self.__H = lambda d: hashlib.md5(d.encode('ascii')).hexdigest()
+            self.__H = _MD5
         elif 'SHA-256' in self.challenge['algorithm']:
-            self.__H = lambda d: hashlib.sha256(d.encode('ascii')).hexdigest()
+            self.__H = _SHA256
         elif 'SHA-512-256' in self.challenge['algorithm']:
-            self.__H = lambda d: hashlib.sha512(d.encode('ascii')).hexdigest()
+            self.__H = _SHA512
 
     def get_auth_digest(self, sip_method, digest_uri, username, password, request_body_hash=None):
         """
@@ -129,6 +147,11 @@ class SipDigestAuth():
         else:
             self.__A1 = A1_Value()
 
+        # H(A1) is the same for each request with the same credentials
+        if self.__HA1[0] != (self.challenge['algorithm'], self.__A1):
+            self.__HA1 = ((self.challenge['algorithm'], self.__A1), self.__H(self.__A1))
+        HA1 = self.__HA1[1]
+
         A2 = '%s:%s' % (sip_method, digest_uri)
         # RFC 3261, 22.4, #8, must set QOP if cnonce is required by algorithm
         if self.cnonce is not None and 'qop' not in self.challenge:
@@ -144,11 +167,11 @@ class SipDigestAuth():
             # Get new cnonce value for non-session authentication
             if '-sess' not in self.challenge['algorithm']:
                 self.cnonce = self.get_new_cnonce(self.challenge['nonce'])
-            request_digest = KD(self.__H(self.__A1), "%s:%s:%s:%s:%s" % \
+            request_digest = KD(HA1, "%s:%s:%s:%s:%s" % \
                 (self.challenge['nonce'], nc_value, self.cnonce,
                  self.challenge['qop'], self.__H(A2)))
         else:
-            request_digest = KD(self.__H(self.__A1), \
+            request_digest = KD(HA1, \
                 "%s:%s" % (self.challenge['nonce'], self.__H(A2)))
 
         digest = 'Digest username="%s", realm="%s", nonce="%s", uri="%s", response="%s"' % \
@@ -8,7 +8,6 @@
 
 from binascii import hexlify
 import inspect
-import itertools
 import os
 import random
 import re
@@ -61,15 +60,14 @@ class HeaderFieldValues():
     def msg2fields(self, sipmsg:str) -> list:
         '''Split SIP message into field-value dictionary. Additional
         data after header fields is in 'Body'.'''
-        # Use takewhile to split the message until an empty line
-        # between fields and body
-        line_iter = itertools.takewhile(lambda x : len(x), sipmsg.splitlines())
-        lines = list(line_iter)
-
-        # Convert list to array, cleaning up keys and values
-        self._fields = [
-            (hf.split(' ', 1)[0].rstrip(': '), hf.split(' ', 1)[1].strip())
-            for hf in lines]
+        # Split the message until an empty line between fields and body,
+        # cleaning up keys and values with a single partition per line
+        self._fields = []
+        for line in sipmsg.splitlines():
+            if not line:
+                break
+            name, _, value = line.partition(' ')
+            self._fields.append((name.rstrip(': '), value.strip()))
 
         content_length = int(self.getfield('Content-Length')[0])
         if content_length:
@@ -104,15 +102,14 @@ def gen_new_branch(length=10):
 def msg2fields(sipmsg:str) -> dict:
     '''Split SIP message into field-value dictionary. Additional
     data after header fields is in 'Body'.'''
-    # Use takewhile to split the message until an empty line
-    # between fields and body
-    line_iter = itertools.takewhile(lambda x : len(x), sipmsg.splitlines())
-    lines = list(line_iter)
-
-    # Convert list to dictionary, cleaning up keys and values
-    fields = {
-        hf.split(' ', 1)[0].rstrip(': '): hf.split(' ', 1)[1].strip()
-        for hf in lines}
+    # Split the message until an empty line between fields and body,
+    # cleaning up keys and values with a single partition per line
+    fields = {}
+    for line in sipmsg.splitlines():
+        if not line:
+            break
+        name, _, value = line.partition(' ')
+        fields[name.rstrip(': ')] = value.strip()
 
     content_length = int(fields['Content-Length'])
     if content_length != 0:
@@ -120,6 +117,27 @@ def msg2fields(sipmsg:str) -> dict:
 
     return fields
 
+def msg2fields_subset(sipmsg:str, wanted) -> dict:
+    '''Split only the wanted header fields from a SIP message into a
+    field-value dictionary. Scanning stops once every wanted field is
+    found, or at the empty line between fields and body.
+
+    :param sipmsg: SIP message.
+    :param wanted: Iterable of header field names to match.
+    :returns dict: Matching fields. Missing fields are not present.'''
+    remaining = set(wanted)
+    fields = {}
+    for line in sipmsg.splitlines():
+        if not line or not remaining:
+            break
+        name, _, value = line.partition(' ')
+        name = name.rstrip(': ')
+        if name in remaining:
+            fields[name] = value.strip()
+            remaining.discard(name)
+
+    return fields
+
 def sdp_fields(sdp_body:str, field:str) -> list:
     '''Retrieve a list of SDP fields from a message.
 
@@ -187,6 +205,14 @@ def factory_field_by_name(field_name):
         return None
     return instance or None
 
+def _clone_value(value):
+    '''Copy dict and list attribute values, share immutable values.'''
+    if isinstance(value, dict):
+        return {k: _clone_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clone_value(v) for v in value]
+    return value
+
 class HeaderField():
     '''Base class for a SIP message header field.'''
     # pylint: disable=too-many-public-methods,invalid-name
@@ -210,6 +236,12 @@ class HeaderField():
         # Should override in subclass
         self.value = hdr_value
 
+    def clone(self):
+        '''Copy of the field, with its own parameter dictionaries.'''
+        new = object.__new__(type(self))
+        new.__dict__ = {k: _clone_value(v) for k, v in self.__dict__.items()}
+        return new
+
     @staticmethod
     def value_for_type(where_set, msg_type, method, new_value, old_value=None):
         '''Return valid value for msessage type.
@@ -600,15 +632,15 @@ class Contact(HeaderField):
     def _to_string(self):
         # pylint: disable=C0209
         param_str = ''
-        for cp_key in self.contact_params.keys():
+        for cp_key in self.contact_params:
             param = self.contact_params[cp_key]
             if param_str:
                 param_str += ','
-            if 'display-name' in self.contact_params[cp_key].keys():
+            if 'display-name' in param:
                 param_str += f'"{self.contact_params[cp_key]["display-name"]}" <{cp_key}>'
             else:
                 param_str += cp_key
-            for pk in param.keys():
+            for pk in param:
                 if pk == 'display-name':
                     continue
                 param_str += ';{}={}'.format(pk, param[pk])
@@ -618,6 +650,22 @@ class Contact(HeaderField):
         self._parse_value(hdr_value)
         self._to_string()
 
+    def set_port(self, port):
+        '''Replace the port of each contact address, keeping its parameters.'''
+        new_params = {}
+        for addr_spec, param in self.contact_params.items():
+            scheme, _, rest = addr_spec.partition(':')
+            if rest:
+                user, at, hostport = rest.rpartition('@')
+                host, colon, _ = hostport.rpartition(':')
+                # No port, or the colon is inside an IPv6 reference
+                if not colon or (hostport.startswith('[') and not host.endswith(']')):
+                    host = hostport
+                addr_spec = f'{scheme}:{user}{at}{host}:{port}'
+            new_params[addr_spec] = param
+        self.contact_params = new_params
+        self._to_string()
+
     def __str__(self):
         return '{}: {}'.format(     # pylint: disable=C0209
             self._shortname if self.use_compact else self._longname,
@@ -1542,7 +1590,7 @@ class Via(HeaderField):
         self._longname = 'Via'
         self.order = 1
         self.via_params = {}
-        self.via_params['address'] = None   # Host name or network address
+        self.via_params['address'] = None   # host:port, or (host, port) tuple
         self.via_params['ttl'] = None # time to live for UDP Multicast packet
         self.via_params['maddr'] = None # page 150, server to be contacted
         self.via_params['received'] = None # RFC 2543, 6.40.2, added for NAT
@@ -1568,11 +1616,14 @@ class Via(HeaderField):
         if self.via_params['protocol-version'] == '2.0':
             assert self.via_params['branch'] is not None
         if self.value is None:
+            address = self.via_params['address']
+            if isinstance(address, tuple):
+                address = '{}:{}'.format(*address)
             self.value = '{}/{}/{} {}'.format(
                 self.via_params['protocol-name'],
                 self.via_params['protocol-version'],
                 self.via_params['transport'],
-                self.via_params['address']) \
+                address) \
                 + ('' if self.via_params['ttl'] is None \
                     else ';ttl={}'.format(self.via_params['ttl'])) \
                 + ('' if self.via_params['maddr'] is None \
@@ -6,24 +6,33 @@ RFC 1889 - obsoleted by 3550
 '''
 
 import asyncio
+import collections
 import logging
+import socket
+
+BUFFER_DEPTH = 5    # packets held before the echo starts
+MAX_BATCH = 16      # most packets sent in one 20ms tick
+MAX_QUEUED = 256    # packets held for echo, the oldest is dropped on overrun
+MAX_DRAIN = 32      # most packets read from the socket on one readiness event
+MAX_DATAGRAM = 2048 # bytes read for each packet
 
 class RtpEcho:
     '''Base datagram transport protocol for delayed echo.'''
     # pylint: disable=R0902
-    def __init__(self, loop:asyncio.unix_events._UnixSelectorEventLoop,
+    def __init__(self, loop:asyncio.AbstractEventLoop,
         on_con_lost:asyncio.Future=None):
         '''Class initialization.'''
         self.loop = loop
         self.on_con_lost = on_con_lost
         self.transport = None
-        self.echo_queue = asyncio.Queue()
+        self.echo_queue = collections.deque(maxlen=MAX_QUEUED)
         self.fire_at = 0
         self.error_count = 0
         self.buffer_count = 0
         self.is_buffered = False
         self.local_addr = None
         self.dest_addr = None
+        self.echo_addr = None   # source of the last received packet
 
     def begin(self):
         '''Begin RTP stream.'''
@@ -41,15 +50,17 @@ class RtpEcho:
 
     def connection_lost(self, exc):
         '''Base transport'''
-        logging.debug('RtpEcho:connection_lost: %s', str(exc))
+        logging.debug('RtpEcho:connection_lost: %s', exc)
         if self.on_con_lost:
             self.on_con_lost.set_result(True)
 
     def datagram_received(self, data, addr): # pylint: disable=W0613
         '''Datagram transport'''
-        self.echo_queue.put_nowait((data, addr))
+        # The stream comes from one peer, so only the payload is queued
+        self.echo_addr = addr
+        self.echo_queue.append(data)
 
-        if self.buffer_count < 5:
+        if self.buffer_count < BUFFER_DEPTH:
             self.buffer_count += 1
             return
 
@@ -62,16 +73,105 @@ class RtpEcho:
 
     def error_received(self, exc):
         '''Error handler for protocol.'''
-        logging.error('RtpEcho:error_received: %s', str(exc))
+        logging.error('RtpEcho:error_received: %s', exc)
         self.error_count += 1
         if self.error_count > 4:
             logging.error('RtpEcho:error_received:closing')
             self.transport.close()
 
     def callback_event(self):
-        '''The callback sends data at roughly 20ms intervals.'''
-        if not self.echo_queue.empty():
-            packet = self.echo_queue.get_nowait()
-            self.transport.sendto(packet[0], addr=packet[1])
+        '''The callback sends data at roughly 20ms intervals.
+        A backlog beyond the buffer depth is sent in the same tick.'''
+        if self.echo_queue:
+            count = min(MAX_BATCH,
+                max(1, len(self.echo_queue) - BUFFER_DEPTH + 1))
+            for _ in range(count):
+                self.transport.sendto(self.echo_queue.popleft(), addr=self.echo_addr)
             self.fire_at += 0.02
             self.loop.call_at(self.fire_at, self.callback_event)
+        else:
+            # Input stopped, buffer again and restart from the next packet
+            self.is_buffered = False
+            self.buffer_count = 0
+            self.fire_at = 0
+
+class DrainTransport(asyncio.DatagramTransport):
+    '''Datagram transport for RtpEcho, reading all queued packets, up to
+    MAX_DRAIN, on each readiness event of the socket. The asyncio datagram
+    transport reads one packet for each event.'''
+    def __init__(self, loop:asyncio.AbstractEventLoop, sock:socket.socket,
+        protocol:RtpEcho):
+        super().__init__(extra={'socket': sock})
+        self._loop = loop
+        self._sock = sock
+        self._protocol = protocol
+        self._closing = False
+        protocol.connection_made(self)
+        loop.add_reader(sock.fileno(), self._drain)
+
+    def _drain(self):
+        '''Reader callback: pass each queued packet to the protocol.'''
+        recvfrom = self._sock.recvfrom
+        datagram_received = self._protocol.datagram_received
+        for _ in range(MAX_DRAIN):
+            try:
+                data, addr = recvfrom(MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as exc:
+                self._protocol.error_received(exc)
+                return
+            datagram_received(data, addr)
+
+    def sendto(self, data, addr=None):
+        '''Send packet to addr. A packet that does not fit in the socket
+        buffer is dropped, as late RTP would be.'''
+        if self._closing:
+            return
+        try:
+            self._sock.sendto(data, addr)
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError as exc:
+            self._protocol.error_received(exc)
+
+    def is_closing(self) -> bool:
+        '''True if the transport is closing or closed.'''
+        return self._closing
+
+    def close(self):
+        '''Stop reading, and close the socket after the protocol is told.'''
+        if self._closing:
+            return
+        self._closing = True
+        self._loop.remove_reader(self._sock.fileno())
+        self._loop.call_soon(self._connection_lost)
+
+    def abort(self):
+        '''Close the transport, there is no write buffer to discard.'''
+        self.close()
+
+    def _connection_lost(self):
+        '''Tell the protocol the transport is closed, then close the socket.'''
+        try:
+            self._protocol.connection_lost(None)
+        finally:
+            self._sock.close()
+
+def create_echo_endpoint(loop:asyncio.AbstractEventLoop, local_addr:tuple,
+    on_con_lost:asyncio.Future=None) -> tuple:
+    '''Create RtpEcho on a UDP socket bound to local_addr, read with
+    DrainTransport. Used in place of loop.create_datagram_endpoint().
+
+    :retval tuple: (transport, protocol)'''
+    family, sock_type, proto, _, sock_addr = socket.getaddrinfo(
+        *local_addr, type=socket.SOCK_DGRAM)[0]
+    sock = socket.socket(family, sock_type, proto)
+    try:
+        sock.setblocking(False)
+        sock.bind(sock_addr)
+    except OSError:
+        sock.close()
+        raise
+    protocol = RtpEcho(loop, on_con_lost=on_con_lost)
+    return DrainTransport(loop, sock, protocol), protocol
@@ -6,7 +6,9 @@ RFC 1889 - obsoleted by 3550
 '''
 
 import asyncio
+import io
 import logging
+from pathlib import Path
 from time import time
 
 import dpkt
@@ -19,13 +21,18 @@ def short(sys_time):
     return (ntplib._to_int(ntp_time) << 16 & 0xFFFFFFFF) | \
         ntplib._to_frac(ntp_time, 16)
 
+async def read_pcap(loop, file_name:str) -> bytes:
+    '''Read a pcap file in the default executor, off the event loop.'''
+    return await loop.run_in_executor(None, Path(file_name).read_bytes)
+
 class RtpPlay:
     '''Base datagram transport protocol for replay of pcap file.'''
     # pylint: disable=R0902
     def __init__(self, loop:asyncio.unix_events._UnixSelectorEventLoop,
-        on_con_lost:asyncio.Future=None, file_name:str=None):
+        on_con_lost:asyncio.Future=None, file_name:str=None, data:bytes=None):
         '''Class initialization.'''
         # on_con_lost: Future object for completion
+        # data: pcap file contents, see read_pcap(), instead of file_name
         self.on_con_lost = on_con_lost
         self.file_name = file_name
         self.loop = loop
@@ -38,9 +45,12 @@ class RtpPlay:
         self.local_addr = None
         self.is_playing = True
 
-        # pylint: disable=R1732
-        assert self.file_name is not None
-        self.pcap_file = open(self.file_name, mode='rb')
+        if data is not None:
+            self.pcap_file = io.BytesIO(data)
+        else:
+            # pylint: disable=R1732
+            assert self.file_name is not None
+            self.pcap_file = open(self.file_name, mode='rb')
         self.pcap_rdr = dpkt.pcap.Reader(self.pcap_file)
         for _ in range(5):
             self._read_rtp()
@@ -94,7 +104,7 @@ class RtpPlay:
 
     def connection_lost(self, exc):
         '''Base transport'''
-        logging.debug('RtpPlay:connection_lost: %s', str(exc))
+        logging.debug('RtpPlay:connection_lost: %s', exc)
         if self.on_con_lost:
             self.on_con_lost.set_result(True)
         self.is_playing = False
@@ -105,7 +115,7 @@ class RtpPlay:
 
     def error_received(self, exc):
         '''Error handler for protocol.'''
-        logging.error('RtpPlay:error_received: %s', str(exc))
+        logging.error('RtpPlay:error_received: %s', exc)
         # self.transport.close()
 
     def callback_event(self):
@@ -3,8 +3,49 @@
 # vim: set ai ts=4 sw=4 expandtab:
 
 #import logging
+from operator import attrgetter
+import re
 import pysiptest.headerfield as hf
 
+# Header field sort key, each field class has a static order value
+_FIELD_ORDER = attrgetter('order')
+
+# Start line: method or SIP version, Request-URI or code, and the remainder
+_FIRST_LINE = re.compile(r'(SIP/2\.0|[A-Z]+) +(\S+) +([^\r\n]*)')
+
+# Header field line of a datagram: token name, and value, RFC 3261 25.1
+_HEADER_LINE = re.compile(rb"([-.!%*_+`'~0-9A-Za-z]+)[ \t]*:[ \t]*([^\r\n]*)\r\n")
+
+def _drops_index(method):
+    '''Wrap list method to clear the field name index and the sorted
+    state before calling.'''
+    def wrapper(self, *args, **kwargs):
+        self.field_index.clear()
+        self.in_order = False
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+class FieldList(list):
+    '''List of header fields, with an index of field lookups by name.
+    The index is cleared, and the list marked unsorted, when fields are
+    added or removed.'''
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.field_index = {}   # field name to field, or None
+        self.in_order = False   # sorted by field order since last change
+
+    append = _drops_index(list.append)
+    extend = _drops_index(list.extend)
+    insert = _drops_index(list.insert)
+    remove = _drops_index(list.remove)
+    pop = _drops_index(list.pop)
+    clear = _drops_index(list.clear)
+    __setitem__ = _drops_index(list.__setitem__)
+    __delitem__ = _drops_index(list.__delitem__)
+    __iadd__ = _drops_index(list.__iadd__)
+
 class SipMessage():
     ''' Minimum SIP Request header '''
 
@@ -31,15 +72,72 @@ class SipMessage():
         '''
         self.sip_version = 'SIP/2.0' # p.28
         self.transport = None
-        self.hdr_fields = []    # List of fields, may be ordered
+        self.hdr_fields = FieldList()   # List of fields, may be ordered
+        self.static_tail = ''   # Pre-serialized header lines, after fields
         self._body = ''
 
+    @property
+    def hdr_fields(self):
+        '''Header fields of message.'''
+        return self._hdr_fields
+
+    @hdr_fields.setter
+    def hdr_fields(self, fields):
+        '''Set header fields of message.'''
+        self._hdr_fields = fields if isinstance(fields, FieldList) \
+            else FieldList(fields)
+
     def field(self, field_name):
-        '''Return the field object by name, or None.'''
-        field_name = field_name.replace('-', '_')
-        hdr_field = [f
-            for f in self.hdr_fields if f.__class__.__name__.rfind(field_name) != -1]
-        return hdr_field[0] if len(hdr_field) == 1 else None
+        '''Return the field object by name, or None. A line of the static
+        tail with exactly that name is moved into the header fields and
+        returned, before matching a field whose name contains it.'''
+        index = self._hdr_fields.field_index
+        if field_name in index and (index[field_name] is not None
+                or not self.static_tail):
+            return index[field_name]
+        name = field_name.replace('-', '_')
+        hdr_field = [f for f in self._hdr_fields if f.__class__.__name__ == name]
+        if len(hdr_field) == 0 and self.static_tail:
+            hdr_field = self._field_from_static(name)
+        if len(hdr_field) == 0:
+            hdr_field = [f for f in self._hdr_fields
+                if f.__class__.__name__.rfind(name) != -1]
+        index[field_name] = hdr_field[0] if len(hdr_field) == 1 else None
+        return index[field_name]
+
+    def _field_from_static(self, name) -> list:
+        '''Move header line for field class name from static tail into
+        the header fields, returning a list of the new field, or empty.'''
+        prefix = name.replace('_', '-') + ':'
+        # Search the tail text, without splitting it into lines
+        tail = self.static_tail
+        start = 0 if tail.startswith(prefix) else tail.find('\r\n' + prefix) + 2
+        if start == 1:     # not found
+            return []
+        hdr_field = hf.by_name(name)
+        assert hdr_field is not None
+        hdr_field.from_string(tail[start + len(prefix):tail.find('\r\n', start)].strip())
+        self.remove_static(name)
+        self._hdr_fields.append(hdr_field)
+        return [hdr_field]
+
+    def clone(self):
+        '''Copy of the message, with each header field cloned.'''
+        new = object.__new__(type(self))
+        new.__dict__.update(self.__dict__)
+        new.hdr_fields = FieldList(f.clone() for f in self._hdr_fields)
+        new.hdr_fields.in_order = self._hdr_fields.in_order
+        return new
+
+    def upsert_field(self, field_name, field_value):
+        '''Set field from string value, adding the field if not present.'''
+        field = self.field(field_name)
+        if field is None:
+            field = hf.by_name(field_name)
+            assert field is not None
+            self._hdr_fields.append(field)
+        field.from_string(field_value)
+        return field
 
     @property
     def body(self):
@@ -63,8 +161,40 @@ class SipMessage():
         self.hdr_fields = hf.factory_mandatory_fields(self)
 
     def sort(self):
-        ''' Sort header fields. '''
-        self.hdr_fields = sorted(self.hdr_fields, key=lambda o: o.order)
+        ''' Sort header fields, if changed since the last sort. '''
+        if not self._hdr_fields.in_order:
+            self._hdr_fields.sort(key=_FIELD_ORDER)
+            self._hdr_fields.in_order = True
+
+    def serialize(self, start_line:str) -> str:
+        '''Get message text from the start line, joined in a single pass.'''
+        self.sort()
+        lines = [start_line]
+        lines.extend([h.__str__() for h in self._hdr_fields])
+        if self.static_tail:
+            # Tail lines sort with the other fields, before Content-Length
+            at_end = not self._hdr_fields or \
+                not isinstance(self._hdr_fields[-1], hf.Content_Length)
+            lines.insert(len(lines) if at_end else -1, self.static_tail[:-2])
+        lines.append('')
+        lines.append(self.body)
+        return '\r\n'.join(lines)
+
+    @staticmethod
+    def first_line(sip_msg:str) -> tuple:
+        '''Split the start line of a message, p.26, section 7.
+
+        :retval tuple: (method, Request-URI, version) for a request,
+            ('SIP/2.0', code, reason phrase) for a response, or None.'''
+        match = _FIRST_LINE.match(sip_msg)
+        return match.groups() if match else None
+
+    def remove_static(self, field_name):
+        ''' Remove header line from static tail by field name. '''
+        prefix = field_name.replace('_', '-') + ':'
+        self.static_tail = ''.join(
+            line for line in self.static_tail.splitlines(keepends=True)
+            if not line.startswith(prefix))
 
     def init_from_msg(self, prevmsg:str):
         ''' Initialize values based on previous message. '''
@@ -80,6 +210,26 @@ class SipMessage():
         assert self.field('Content_Length') is not None
         self.field('Content_Length').value = 0
 
+    def init_from_bytes(self, prevmsg:bytes):
+        ''' Initialize values based on previous message datagram, matching
+        the header field lines without decoding the whole message. '''
+        assert isinstance(prevmsg, bytes)
+        # Header lines are after the start line, through the empty line
+        end = prevmsg.find(b'\r\n\r\n')
+        end = len(prevmsg) if end == -1 else end + 2
+        values = {}
+        for match in _HEADER_LINE.finditer(prevmsg, prevmsg.find(b'\r\n') + 2, end):
+            values.setdefault(match.group(1), match.group(2))
+        if len(self.hdr_fields) == 0:
+            self.init_mandatory()
+        for hfield in self.hdr_fields:
+            value = values.get(hfield.__class__.__name__.replace('_', '-').encode())
+            if value is not None:
+                hfield.from_string(value.decode('utf-8', 'surrogateescape').strip())
+
+        assert self.field('Content_Length') is not None
+        self.field('Content_Length').value = 0
+
 class Rfc3261(SipMessage):
     ''' Messages based on RFC 3261 '''
     def __init__(self):
@@ -109,13 +259,12 @@ class Request(Rfc3261):
         '''Return the method from a request message.'''
         if sip_msg.startswith('SIP/2.0'):
             return None
-        return sip_msg.split(maxsplit=1)[0]
+        match = _FIRST_LINE.match(sip_msg)
+        return match.group(1) if match else sip_msg.split(maxsplit=1)[0]
 
     def __str__(self):
         '''Get string value of SIP request.'''
-        return self.request_line + "\r\n" + \
-            "\r\n".join([h.__str__() for h in self.hdr_fields]) + \
-            '\r\n\r\n' + self.body
+        return self.serialize(self.request_line)
 
     @property
     def request_line(self):
@@ -147,14 +296,13 @@ class Response(Rfc3261):
     def get_code(sip_msg:str) -> str:
         '''Return the response code from a response message.'''
         if sip_msg.startswith('SIP/2.0'):
-            return sip_msg.split(maxsplit=2)[1]
+            match = _FIRST_LINE.match(sip_msg)
+            return match.group(2) if match else sip_msg.split(maxsplit=2)[1]
         return None
 
     def __str__(self):
         '''Get string value of SIP response.'''
-        return self.status_line + "\r\n" + \
-            "\r\n".join([h.__str__() for h in self.hdr_fields]) + \
-            '\r\n\r\n' + self.body
+        return self.serialize(self.status_line)
 
     @property
     def status_line(self):
@@ -4,9 +4,11 @@ Protocol factory supporting SIP phone.
 '''
 
 import asyncio
-import copy
+import collections
 import logging
+import re
 
+from pysiptest._constants import DEFAULT_USER_AGENT
 from pysiptest.digestauth import SipDigestAuth
 from pysiptest import support
 import pysiptest.headerfield as hf
@@ -14,15 +16,103 @@ from pysiptest import sipmsg
 
 # pylint: disable=R0904
 
+# First connection address and first media port, RFC 4566, 5.7 and 5.14
+_SDP_CONNECTION = re.compile(r'^c=\S+ \S+ (\S+)', re.M)
+_SDP_MEDIA = re.compile(r'^m=\S+ (\d+)', re.M)
+
+# First Via header field value of a received datagram, long or compact form
+_VIA_VALUE = re.compile(rb'^(?:Via|v)[ \t]*:([^\r\n]*)', re.M | re.I)
+
+# Call-ID header field value of a datagram, long or compact form
+_CALL_ID_VALUE = re.compile(rb'^(?:Call-ID|i)[ \t]*:[ \t]*([^\r\n]*)', re.M | re.I)
+
+# Request line of a datagram, with the method
+_REQUEST_LINE = re.compile(rb'([A-Z]+) +\S+ +SIP/2\.0\r\n')
+
+# Requests that AutoAnswer tracks by Call-ID
+_DIALOG_METHODS = (b'INVITE', b'BYE', b'CANCEL')
+
+# Requests that AutoReply answers with 200 OK
+_AUTO_REPLY_METHODS = frozenset(('INFO', 'NOTIFY', 'OPTIONS', 'UPDATE'))
+
+# Per-datagram debug logging is skipped unless the root logger would emit it
+_log_enabled = logging.root.isEnabledFor
+
 def rtp_sockname_from_sdp(sip_msg:str) -> tuple:
     '''Construct sockname from SDP message.'''
-    fields = hf.HeaderFieldValues(sip_msg)
-    assert 'sdp' in fields.getfield('Content-Type')[0]
-    body = sip_msg[len(sip_msg) - int(fields.getfield('Content-Length')[0]):]
-    sock_ip = hf.sdp_fields(body, 'c')[0][2:].split()[-1]
-    sock_addr = int(hf.sdp_fields(body, 'm')[0][2:].split()[1])
+    fields = hf.msg2fields_subset(sip_msg, ('Content-Type', 'Content-Length'))
+    assert 'sdp' in fields['Content-Type']
+    body = sip_msg[len(sip_msg) - int(fields['Content-Length']):]
+    sock_ip = _SDP_CONNECTION.search(body).group(1)
+    sock_addr = int(_SDP_MEDIA.search(body).group(1))
     return (sock_ip, sock_addr)
 
+class MessageHistory(collections.deque):
+    '''Bounded history of SIP messages, indexed by method or response code.
+    The oldest message is dropped, and unindexed, when the history is full.'''
+    def __init__(self, maxlen=64):
+        super().__init__(maxlen=maxlen)
+        self._index = {}                        # key to deque of sequence numbers
+        self._keys = collections.deque(maxlen=maxlen)   # key for each message
+        self._count = 0                         # messages added, ever
+
+    def add(self, key:str, msg):
+        '''Append message to history under key.'''
+        if len(self) == self.maxlen:
+            old_seqs = self._index[self._keys[0]]
+            old_seqs.popleft()
+            if not old_seqs:
+                del self._index[self._keys[0]]
+        self._index.setdefault(key, collections.deque()).append(self._count)
+        self._keys.append(key)
+        self._count += 1
+        self.append(msg)
+
+    def last(self, key:str):
+        '''Most recent message for key, or None.'''
+        seqs = self._index.get(key)
+        return self[seqs[-1] - self._count] if seqs else None
+
+    def matching(self, key:str) -> list:
+        '''All messages for key, oldest first.'''
+        return [self[seq - self._count] for seq in self._index.get(key, ())]
+
+class MessageQueue(collections.deque):
+    '''Received messages waiting for a step, with one consumer.
+    Provides the asyncio.Queue methods used by steps, without the
+    getter and putter futures.'''
+    def __init__(self):
+        super().__init__()
+        self._ready = asyncio.Event()   # set while messages are queued
+
+    def put_nowait(self, msg):
+        '''Queue message, waking a waiting consumer.'''
+        self.append(msg)
+        self._ready.set()
+
+    def get_nowait(self):
+        '''Remove and return the oldest message, or raise QueueEmpty.'''
+        if not self:
+            raise asyncio.QueueEmpty
+        msg = self.popleft()
+        if not self:
+            self._ready.clear()
+        return msg
+
+    async def get(self):
+        '''Remove and return the oldest message, waiting for one.'''
+        while not self:
+            await self._ready.wait()
+        return self.get_nowait()
+
+    def empty(self) -> bool:
+        '''True if no message is queued.'''
+        return not self
+
+    def qsize(self) -> int:
+        '''Number of queued messages.'''
+        return len(self)
+
 class SipPhoneUdpClient:
     '''
     Factory transport class to support SIP protocol.
@@ -32,20 +122,27 @@ class SipPhoneUdpClient:
         '''Initialization
 
         :param on_con_lost: Optional
+        :param history_len: Optional, messages kept in each of
+            recvd_pkts and sent_msgs
         '''
         self.on_con_lost = kwargs['on_con_lost'] \
             if 'on_con_lost' in kwargs else None
+        history_len = kwargs['history_len'] \
+            if 'history_len' in kwargs else 64
         self.user_info = kwargs['user_info'] \
             if 'user_info' in kwargs else {}
         self.header_fields = kwargs['header_fields'] \
             if 'header_fields' in kwargs else {
-                'User-Agent': 'pysip/123456_DEADBEEFCAFE',
+                'User-Agent': DEFAULT_USER_AGENT,
                 'Expires': 120}
         self.wait = None                    # General wait point
         self.transport = None
-        self.recvd_pkts = []                # all received packets (string)
-        self.sent_msgs = []                 # all sent SIP messages
-        self.rcv_queue = asyncio.Queue()    # received packets for Behave
+        self.recvd_pkts = MessageHistory(history_len)   # received packets (string)
+        self.sent_msgs = MessageHistory(history_len)    # sent SIP messages
+        self._fields_cache = {}             # id(msg) to (msg, HeaderFieldValues)
+        self._rx_data = None                # last decoded datagram, and
+        self._rx_msg = None                 # its decoded message
+        self.rcv_queue = MessageQueue()     # received packets for Behave
         self.state_callback = {}            # Call-ID to method for state mach
         self._cseq_in_dialog = 0
         self._cseq_out_of_dialog = 0
@@ -88,30 +185,50 @@ class SipPhoneUdpClient:
 
         :param method: Method name to match, from last sent message.
         :retval sipmsg.SipMessage: Message matching method, or None.'''
-        for i in range(len(self.sent_msgs)-1, -1, -1):
-            if self.sent_msgs[i].method == method:
-                return copy.deepcopy(self.sent_msgs[i])
-        return None
+        sent_msg = self.sent_msgs.last(method)
+        return sent_msg.clone() if sent_msg is not None else None
 
     def get_prev_rcvd(self, method:str) -> str:
         '''Get a copy of first matching previously received message.
 
         :param method: Method name or code, starting from last received message.
         :retval str: Matching message, or None.'''
-        for i in range(len(self.recvd_pkts)-1, -1, -1):
-            msg_line = self.recvd_pkts[i].splitlines()[0].split()[0:2]
-            logging.debug('get_prev_rcvd:msg_line=%s', msg_line)
-            if method in msg_line:
-                return copy.copy(self.recvd_pkts[i])
-        return None
+        return self.recvd_pkts.last(method)
 
     def get_rcvd(self, method_code:str) -> list:
         '''Get a shallow copy of all previously received messages for method or code.
 
         :param method: Method name or code, starting from first received message.
         :retval list: Matching messages, or empty list.'''
-        return [ m for m in self.recvd_pkts
-            if method_code in m.splitlines()[0].split()[0:2] ]
+        return self.recvd_pkts.matching(method_code)
+
+    def fields_of(self, sip_msg:str) -> hf.HeaderFieldValues:
+        '''Get parsed header fields for a message, parsing it only once.
+
+        :param sip_msg: Received SIP message, such as from recvd_pkts.
+        :retval hf.HeaderFieldValues: Header fields, shared, do not modify.'''
+        cached = self._fields_cache.get(id(sip_msg))
+        if cached is None or cached[0] is not sip_msg:
+            cached = (sip_msg, hf.HeaderFieldValues(sip_msg))
+            self._fields_cache[id(sip_msg)] = cached
+        return cached[1]
+
+    def decode_datagram(self, data:bytes) -> str:
+        '''Decode a received datagram, once for all protocol classes.'''
+        if data is not self._rx_data:
+            self._rx_data = data
+            # SIP text is UTF-8, escape bad bytes so that a malformed
+            # packet cannot fail, and sendto() restores them unchanged
+            self._rx_msg = data.decode('utf-8', 'surrogateescape')
+        return self._rx_msg
+
+    def append_rcvd(self, sip_msg:str):
+        '''Save received message, indexed by method or response code.'''
+        start = sip_msg.split(maxsplit=2)
+        key = start[1] if start[0] == 'SIP/2.0' else start[0]
+        if len(self.recvd_pkts) == self.recvd_pkts.maxlen:
+            self._fields_cache.pop(id(self.recvd_pkts[0]), None)
+        self.recvd_pkts.add(key, sip_msg)
 
     def connection_made(self, transport):
         '''Base protcol: Called when a connection is made.'''
@@ -128,27 +245,36 @@ class SipPhoneUdpClient:
     def datagram_received(self, data, addr):    # pylint: disable=W0613
         '''Datagram protcol: Called when a datagram is received.
         The is put on the rcv_queue if there is no Call-ID'''
-        logging.debug('SipPhoneUdpClient:datagram_received')
-        sip_msg = data.decode()
-        logging.debug('SipPhoneUdpClient:datagram_received: sip_msg=%s', sip_msg)
-        self.recvd_pkts.append(copy.copy(sip_msg))
-        sip_fields = hf.HeaderFieldValues(sip_msg)
-        if sip_fields.getfield('Call-ID')[0] in self.state_callback:
-            callback = self.state_callback.pop(sip_fields.getfield('Call-ID')[0])
+        sip_msg = self.decode_datagram(data)
+        if _log_enabled(logging.DEBUG):
+            logging.debug('SipPhoneUdpClient:datagram_received: sip_msg=%s', sip_msg)
+        self.append_rcvd(sip_msg)
+        # Header fields are parsed later, by fields_of(), only if needed
+        call_id = _CALL_ID_VALUE.search(data)
+        call_id = call_id.group(1).strip().decode('utf-8', 'surrogateescape') if call_id else None
+        if call_id in self.state_callback:
+            callback = self.state_callback.pop(call_id)
             assert hasattr(callback, '__call__')
-            logging.debug(
-                'SipPhoneUdpClient:datagram_received:callback=%s, Call-ID=%s',
-                callback.__name__, sip_fields.getfield('Call-ID')[0])
+            if _log_enabled(logging.DEBUG):
+                logging.debug(
+                    'SipPhoneUdpClient:datagram_received:callback=%s, Call-ID=%s',
+                    callback.__name__, call_id)
             callback(sip_msg)
         else:
-            self.rcv_queue.put_nowait(copy.copy(sip_msg))
+            self.rcv_queue.put_nowait(sip_msg)
 
-    def sendto(self, sip_msg: sipmsg.SipMessage):
-        '''Send SIP message to UAS.'''
-        logging.debug('SipPhoneUdpClient:sendto')
-        logging.debug('SipPhoneUdpClient:sendto: sipmsg=%s', str(sip_msg))
-        self.sent_msgs.append(sip_msg)
-        self.transport.sendto(str(sip_msg).encode())
+    def sendto(self, sip_msg: sipmsg.SipMessage) -> bytes:
+        '''Send SIP message to UAS.
+
+        :retval bytes: Datagram sent.'''
+        # Serialize once, for both the log and the datagram
+        msg_str = str(sip_msg)
+        if _log_enabled(logging.DEBUG):
+            logging.debug('SipPhoneUdpClient:sendto: sipmsg=%s', msg_str)
+        self.sent_msgs.add(sip_msg.method, sip_msg)
+        datagram = msg_str.encode('utf-8', 'surrogateescape')
+        self.transport.sendto(datagram)
+        return datagram
 
     def error_received(self, exc):
         '''Datagram protcol: Called when an error is received.'''
@@ -252,6 +378,7 @@ class KeepAlive(RegisterUnregister):
         self.fire_at = None
         self.ka_interval = 60 # seconds
         self.branch = None
+        self._branch_bytes = None   # branch, encoded for datagram matching
 
     def connection_made(self, transport):
         super().connection_made(transport)
@@ -262,15 +389,18 @@ class KeepAlive(RegisterUnregister):
             header_fields=self.header_fields)
         self.options_msg.field('CSeq').value = self.cseq_out_of_dialog
         self.branch = self.options_msg.field('Via').via_params['branch']
+        self._branch_bytes = self.branch.encode()
         self.fire_at = self.loop.time() + self.ka_interval
         self.loop.call_at(self.fire_at, self.callback_event)
 
     def datagram_received(self, data, addr):    # pylint: disable=W0613
         '''Datagram Protocol: intercept OK from UAS.'''
-        msg_dict = hf.HeaderFieldValues(data.decode())
-        if self.branch is None or \
-                self.branch not in msg_dict.getfield('Via')[0]:
-            logging.debug('KeepAlive:datagram_received')
+        # Match on the datagram bytes, other classes decode if needed
+        via = _VIA_VALUE.search(data)
+        if self._branch_bytes is None or via is None or \
+                self._branch_bytes not in via.group(1):
+            if _log_enabled(logging.DEBUG):
+                logging.debug('KeepAlive:datagram_received')
             super().datagram_received(data, addr)
 
     def callback_event(self):
@@ -286,23 +416,41 @@ class AutoReply(KeepAlive):
     '''
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.auto_reply = ['INFO', 'NOTIFY', 'OPTIONS', 'UPDATE']
+        # Last auto-replied request and its encoded response, to resend
+        # the same response to a retransmission, RFC 3261 17.2.2
+        self._replied = (None, None)
+        # 200 OK with the mandatory fields for each method, cloned per reply
+        self._templates = {
+            method: self._make_template(method) for method in _AUTO_REPLY_METHODS}
+
+    @staticmethod
+    def _make_template(method:str) -> sipmsg.Response:
+        '''Create a sorted 200 OK response with mandatory fields for method.'''
+        template = sipmsg.Response(status_code=200, reason_phrase='OK')
+        template.method = method
+        template.init_mandatory()
+        template.sort()
+        return template
 
     def datagram_received(self, data, addr):    # pylint: disable=W0613
         '''Datagram protcol: Called when a datagram is received.'''
-        logging.debug('AutoReply:datagram_received')
-        sip_msg = data.decode()
-        sip_method = sip_msg.split(maxsplit=1)[0]
-        if sip_method in self.auto_reply:
-            logging.debug('AutoReply:datagram_received: auto reply to %s', sip_method)
+        # Method from the request line bytes, decode only for a reply
+        request_line = _REQUEST_LINE.match(data)
+        sip_method = request_line.group(1).decode('latin-1') \
+            if request_line else ''
+        if sip_method in _AUTO_REPLY_METHODS:
+            if _log_enabled(logging.DEBUG):
+                logging.debug('AutoReply:datagram_received: auto reply to %s', sip_method)
+            sip_msg = self.decode_datagram(data)
             # Append packet for later reference, respond, exit processing
-            self.recvd_pkts.append(copy.copy(sip_msg))
-            response = sipmsg.Response(status_code=200, reason_phrase='OK')
-            response.method = sip_method
-            response.init_from_msg(sip_msg)
+            self.append_rcvd(sip_msg)
+            if data == self._replied[0]:
+                self.transport.sendto(self._replied[1])
+                return
+            response = self._templates[sip_method].clone()
+            response.init_from_bytes(data)
             support.insert_behave_fields(self.header_fields, response)
-            response.sort()
-            self.sendto(response)
+            self._replied = (data, self.sendto(response))
             return
 
         super().datagram_received(data, addr)
@@ -334,20 +482,23 @@ class AutoAnswer(AutoReply):
 
     def datagram_received(self, data, addr):    # pylint: disable=W0613
         '''Process datagram for INVITE or ACK.'''
-        sip_msg = data.decode()
-        method = sip_msg.split(maxsplit=1)[0]
-        fields = hf.HeaderFieldValues(sip_msg)
-        logging.debug('AutoAnswer:datagram_received:method=%s', method)
-        if method == 'INVITE':
-            if 'call_id' not in self.dialog:
-                self.dialog['call_id'] = fields.getfield('Call-ID')[0]
-            if 'contact' not in self.dialog:
-                self.dialog['contact'] = fields.getfield('Contact')[0].strip('<>')
-            self.state_callback[fields.getfield('Call-ID')[0]] = self.answer_invite
-        if method == 'BYE':
-            self.state_callback[fields.getfield('Call-ID')[0]] = self.bye_dialog
-        if method == 'CANCEL':
-            self.state_callback[fields.getfield('Call-ID')[0]] = self.cancel_dialog
+        # Only dialog requests are decoded and parsed here
+        method = data[:data.find(b' ')]
+        if _log_enabled(logging.DEBUG):
+            logging.debug('AutoAnswer:datagram_received:method=%s', method)
+        if method in _DIALOG_METHODS:
+            fields = hf.msg2fields_subset(self.decode_datagram(data), ('Call-ID', 'Contact'))
+            call_id = fields['Call-ID']
+            if method == b'INVITE':
+                if 'call_id' not in self.dialog:
+                    self.dialog['call_id'] = call_id
+                if 'contact' not in self.dialog:
+                    self.dialog['contact'] = fields['Contact'].strip('<>')
+                self.state_callback[call_id] = self.answer_invite
+            if method == b'BYE':
+                self.state_callback[call_id] = self.bye_dialog
+            if method == b'CANCEL':
+                self.state_callback[call_id] = self.cancel_dialog
 
         super().datagram_received(data, addr)
 
@@ -368,25 +519,25 @@ class AutoAnswer(AutoReply):
             self.dialog['req_uri'])
         self.rtp_endpoint.dest_addr = rtp_sockname_from_sdp(sip_msg)
 
+        # The INVITE is parsed once, into 100 Trying; later responses are clones
         logging.debug('AutoAnswer:answer_invite:sending:Trying')
-        response = sipmsg.Response(
+        trying = sipmsg.Response(
             prev_msg=sip_msg, status_code='100', reason_phrase='Trying')
-        support.insert_behave_fields(self.header_fields, response)
-        response.sort()
-        self.answer_queue.put_nowait(response)
+        support.insert_behave_fields(self.header_fields, trying)
+        trying.sort()
+        self.answer_queue.put_nowait(trying)
 
-        self.dialog['uas_tag'] = response.field('From').tag
+        self.dialog['uas_tag'] = trying.field('From').tag
         self.dialog['uac_tag'] = hf.gen_tag()
-        self.dialog['uas_user'] = response.field('From').value
-        self.dialog['uac_user'] = response.field('To').value
+        self.dialog['uas_user'] = trying.field('From').value
+        self.dialog['uac_user'] = trying.field('To').value
 
         logging.debug('AutoAnswer:answer_invite:sending:Ringing')
         for _ in range(self.num_rings):
-            response = sipmsg.Response(
-                prev_msg=sip_msg, status_code='180', reason_phrase='Ringing')
+            response = trying.clone()
+            response.status_code = '180'
+            response.reason_phrase = 'Ringing'
             response.field('To').tag = self.dialog['uac_tag']
-            support.insert_behave_fields(self.header_fields, response)
-            response.sort()
             self.answer_queue.put_nowait(response)
 
         # pylint: disable=C0301
@@ -395,13 +546,13 @@ class AutoAnswer(AutoReply):
         self.rtp_endpoint.begin()
 
         logging.debug('AutoAnswer:answer_invite:sending:OK')
-        response = sipmsg.Response(
-            prev_msg=sip_msg, status_code='200', reason_phrase='OK')
+        response = trying.clone()
+        response.status_code = '200'
+        response.reason_phrase = 'OK'
         response.field('To').tag = self.dialog['uac_tag']
         response.body = support.sip_sdp(username=self.user_info['name'],
             sockname=self.rtp_endpoint.local_addr)
         response.hdr_fields.append(hf.Content_Type(value='application/sdp'))
-        support.insert_behave_fields(self.header_fields, response)
         response.sort()
         self.answer_queue.put_nowait(response)
 
@@ -494,6 +645,19 @@ class AutoAnswer(AutoReply):
         self.dialog['contact'] = f'sip:{self.user_info["extension"]}@{self.local_addr[0]}'
         self.sendto(invite)
 
+    async def call(self, recipient) -> bool:
+        '''Dial recipient, and wait until the call is answered or fails.
+        Authentication and provisional responses are handled by the
+        dial state machine callbacks.
+
+        :retval bool: True if the call was answered.'''
+        self.wait = self.loop.create_future()
+        self.dial(recipient)
+        try:
+            return await self.wait
+        finally:
+            self.wait = None
+
     def dial_callback(self, sip_msg:str):
         '''State machine callback for INVITE sequence. Expect response.'''
         logging.debug('AutoAnswer:dial_callback')
@@ -520,31 +684,31 @@ class AutoAnswer(AutoReply):
     def dial_100trying(self, sip_msg:str):
         '''State machine callback for 100 Trying.'''
         logging.debug('AutoAnswer:dial_100trying')
-        fields = hf.HeaderFieldValues(sip_msg)
+        fields = self.fields_of(sip_msg)
         self.state_callback[fields.getfield('Call-ID')[0]] = self.dial_callback
 
     def dial_180ringing(self, sip_msg:str):
         '''State machine callback for 180 Ringing.'''
         logging.debug('AutoAnswer:dial_180ringing')
-        fields = hf.HeaderFieldValues(sip_msg)
+        fields = self.fields_of(sip_msg)
         self.state_callback[fields.getfield('Call-ID')[0]] = self.dial_callback
 
     def dial_181forwarded(self, sip_msg:str):
         '''State machine callback for 181 Call Is Being Fowarded.'''
         logging.debug('AutoAnswer:dial_181forwarded')
-        fields = hf.HeaderFieldValues(sip_msg)
+        fields = self.fields_of(sip_msg)
         self.state_callback[fields.getfield('Call-ID')[0]] = self.dial_callback
 
     def dial_182queued(self, sip_msg:str):
         '''State machine callback for 182 Queued.'''
         logging.debug('AutoAnswer:dial_182queued')
-        fields = hf.HeaderFieldValues(sip_msg)
+        fields = self.fields_of(sip_msg)
         self.state_callback[fields.getfield('Call-ID')[0]] = self.dial_callback
 
     def dial_183sessionprogress(self, sip_msg:str):
         '''State machine callback for 183 Session Progress.'''
         logging.debug('AutoAnswer:dial_183sessionprogress')
-        fields = hf.HeaderFieldValues(sip_msg)
+        fields = self.fields_of(sip_msg)
         self.state_callback[fields.getfield('Call-ID')[0]] = self.dial_callback
         self.dialog['uas_tag'] = fields.getfield('To')[0].split('=')[-1]
         self.dialog['session_id'] = fields.getfield('Session-ID')[0]
@@ -560,7 +724,7 @@ class AutoAnswer(AutoReply):
     def dial_407proxy_auth_req(self, sip_msg:str):
         '''State machine callback for 407 Proxy Authentication Required.'''
         logging.debug('AutoAnswer:dial_407proxy_auth_req')
-        sip_fields = hf.HeaderFieldValues(sip_msg)
+        sip_fields = self.fields_of(sip_msg)
         # RFC 8760 - there may be more than one authenticate
         assert 'Proxy-Authenticate' in sip_fields.field_names
         # send ACK for 407
@@ -581,7 +745,6 @@ class AutoAnswer(AutoReply):
             hf.Proxy_Authorization(value=self.get_digest_auth(
                 sip_fields.getfield('Proxy-Authenticate')[0],
                 invite.method, self.user_info, uri=self.user_info['sipuri'])))
-        invite.sort()
 
         self.state_callback[invite.field('Call_ID').value] = self.dial_callback
         self.sendto(invite)
@@ -595,7 +758,7 @@ class AutoAnswer(AutoReply):
             str(self.rtp_endpoint.local_addr), str(self.rtp_endpoint.dest_addr))
         self.rtp_endpoint.begin()
 
-        fields = hf.HeaderFieldValues(sip_msg)
+        fields = self.fields_of(sip_msg)
         self.dialog['req_uri'] = fields.getfield('Contact')[0].strip('<>')
         logging.debug('AutoAnswer:dial_200ok:dialog:req_uri=%s', self.dialog['req_uri'])
         self.dialog['uas_tag'] = fields.getfield('To')[0].split(';')[-1].split('=')[-1]
@@ -625,8 +788,7 @@ class AutoAnswer(AutoReply):
         bye = sipmsg.Bye(request_uri=self.dialog['req_uri'])
         bye.init_mandatory()
         bye.field('Via').via_params['transport'] = 'udp'
-        bye.field('Via').via_params['address'] = \
-            f'{self.local_addr[0]}:{self.local_addr[1]}'
+        bye.field('Via').via_params['address'] = self.local_addr
         bye.field('From').value = \
             f'{self.user_info["name"]} <{self.user_info["sipuri"]}>'
         bye.field('To').value = self.dialog['uas_user']
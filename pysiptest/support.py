@@ -4,12 +4,48 @@
 Functions to support steps Feature: Registration, RFC 3665, Section 2
 '''
 
+import asyncio
 import logging
-import os
 import random
 
 import pysiptest.headerfield as hf
 from pysiptest import sipmsg
+from pysiptest._constants import ALLOW_METHODS, SUPPORTED_DEFAULT
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Invariant header lines, serialized once and set as the message static tail
+_ALLOW_LINE = f'{hf.Allow(value=ALLOW_METHODS)}\r\n'
+_SUPPORTED_LINE = f'{hf.Supported(value=SUPPORTED_DEFAULT)}\r\n'
+
+# Values for out-of-dialog requests created by _build_request, by method
+_METHOD_SPECS = {
+    'REGISTER': {'random_cseq': True, 'static_tail': _ALLOW_LINE},
+    'INVITE': {'random_cseq': True, 'static_tail': _ALLOW_LINE},
+    'OPTIONS': {'random_cseq': False, 'static_tail': _ALLOW_LINE},
+    'REFER': {'random_cseq': False, 'static_tail': _ALLOW_LINE},
+    'SUBSCRIBE': {'random_cseq': False,
+        'static_tail': _ALLOW_LINE + _SUPPORTED_LINE},
+    'PUBLISH': {'random_cseq': False,
+        'static_tail': _ALLOW_LINE + _SUPPORTED_LINE},
+}
+
+# SDP body, RFC 4566: username, session ID, version, address, address, port
+_SDP_TEMPLATE = (
+    'v=0\r\n'
+    'o=%s %d %d IN IP4 %s\r\n'
+    's=test SDP stream\r\n'
+    'c=IN IP4 %s\r\n'
+    't=0 0\r\n'
+    'm=audio %d RTP/AVP 0 9 101\r\n'
+    'a=rtpmap:0 PCMU/8000\r\n'
+    'a=rtpmap:9 G722/8000\r\n'
+    'a=rtpmap:101 telephone-event/8000\r\n'
+    'a=fmtp:101 0-15\r\n'
+    'a=sendrecv\r\n')
 
 def sip_sdp(username, sockname=None) -> str:
     '''Create SDP info, RFC 4566, Obsoletes: 2327, 3266
@@ -22,7 +58,6 @@ def sip_sdp(username, sockname=None) -> str:
     assert isinstance(sockname, tuple)
     ipaddr = sockname[0]
     audio_port = sockname[1]
-    random.seed()
     # <username> is the user's login on the originating host, or it is "-"
     session_id = random.randint(32768, 65535) # Unique
     version = 0 # "This memo defines version 0."
@@ -30,18 +65,26 @@ def sip_sdp(username, sockname=None) -> str:
     # <addrtype> : network
     # <unicast-address> : sockname
 
-    return f'''v=0
-o={username} {session_id} {version} IN IP4 {ipaddr}
-s=test SDP stream
-c=IN IP4 {ipaddr}
-t=0 0
-m=audio {audio_port} RTP/AVP 0 9 101
-a=rtpmap:0 PCMU/8000
-a=rtpmap:9 G722/8000
-a=rtpmap:101 telephone-event/8000
-a=fmtp:101 0-15
-a=sendrecv
-'''.replace('\n', '\r\n')
+    return _SDP_TEMPLATE % (
+        username, session_id, version, ipaddr, ipaddr, audio_port)
+
+def use_uvloop() -> bool:
+    '''Opt in to uvloop, when installed, by setting a new uvloop event loop
+    as the current loop, such as for behave's async context.
+
+    :retval bool: True if uvloop is used.'''
+    if uvloop is None:
+        return False
+    asyncio.set_event_loop(uvloop.new_event_loop())
+    return True
+
+async def drain_at_least(queue:asyncio.Queue, count:int=None) -> list:
+    '''Await one queued item, then take what is already queued without
+    awaiting, up to count items in total (all of them when count is None).'''
+    items = [await queue.get()]
+    while (count is None or len(items) < count) and not queue.empty():
+        items.append(queue.get_nowait())
+    return items
 
 def insert_behave_fields(behave_fields, sip_msg):
     '''Insert headers from Behave tests into message, where valid.'''
@@ -58,6 +101,35 @@ def insert_behave_fields(behave_fields, sip_msg):
                     new_field.value = hfv
                     sip_msg.hdr_fields.append(new_field)
 
+def _build_request(request, sock_addr:tuple, from_value:str, to_value:str) \
+        -> sipmsg.SipMessage:
+    '''Initialize the mandatory fields common to out-of-dialog requests.
+
+    :param request: New request message, with request URI set.
+    :param sock_addr: Local SIP socket address tuple
+    :param from_value: From field value
+    :param to_value: To field value
+    '''
+    spec = _METHOD_SPECS[request.method]
+    request.init_mandatory()
+    via = request.field('Via')
+    via.via_params['transport'] = 'UDP'
+    via.via_params['address'] = sock_addr
+    cseq = request.field('CSeq')
+    cseq.method = request.method
+    if spec['random_cseq']:
+        cseq.value = random.getrandbits(16)
+    request.field('From').value = from_value
+    request.field('To').value = to_value
+    request.static_tail = spec['static_tail']
+    return request
+
+def _finish_request(request, header_fields) -> sipmsg.SipMessage:
+    '''Insert Behave header fields and sort the request.'''
+    insert_behave_fields(header_fields, request)
+    request.sort()
+    return request
+
 def sip_register(sock_addr:tuple, userinfo:dict, expires:int=60,
         header_fields=None) -> sipmsg.SipMessage:
     '''Provide default values for REGISTER request.'''
@@ -65,25 +137,16 @@ def sip_register(sock_addr:tuple, userinfo:dict, expires:int=60,
     assert isinstance(userinfo, dict)
     assert isinstance(expires, int)
 
-    register = sipmsg.Register()
-    register.request_uri = f'sip:{userinfo["domain"]}'
-    register.init_mandatory()
-    register.field('CSeq').method = register.method
-    register.field('CSeq').value = int.from_bytes(os.urandom(2), 'little')
-    register.field('To').value = f'{userinfo["name"]} <{userinfo["sipuri"]}>'
-    register.field('From').value = f'{userinfo["name"]} <{userinfo["sipuri"]}>'
-    register.field('Via').via_params['transport'] = 'UDP'
-    register.field('Via').via_params['address'] = \
-        f'{sock_addr[0]}:{sock_addr[1]}'
-    register.field('Contact')
+    hostport = f'{sock_addr[0]}:{sock_addr[1]}'
+    user_uri = f'{userinfo["name"]} <{userinfo["sipuri"]}>'
+
+    register = _build_request(
+        sipmsg.Register(request_uri=f'sip:{userinfo["domain"]}'),
+        sock_addr, user_uri, user_uri)
     register.hdr_fields.append(hf.Contact(
-        value=f'<sip:{userinfo["extension"]}@{sock_addr[0]}:{sock_addr[1]}>'))
+        value=f'<sip:{userinfo["extension"]}@{hostport}>'))
     register.hdr_fields.append(hf.Expires(value=expires))
-    register.hdr_fields.append(hf.Allow(
-        value='ACK, BYE, CANCEL, INFO, INVITE, MESSAGE, NOTIFY, OPTIONS, REFER, SUBSCRIBE, UPDATE'))
-    insert_behave_fields(header_fields, register)
-    register.sort()
-    return register
+    return _finish_request(register, header_fields)
 
 def sip_invite(sock_addr:tuple, caller_info:hash, receiver_info:hash,
         rtp_socket:tuple, request_uri:str=None, header_fields=None) \
@@ -100,29 +163,17 @@ def sip_invite(sock_addr:tuple, caller_info:hash, receiver_info:hash,
     assert isinstance(caller_info, dict)
     assert isinstance(receiver_info, dict)
     assert isinstance(rtp_socket, tuple)
-    invite = sipmsg.Invite()
-    invite.request_uri = request_uri if request_uri is not None else \
-            f'{receiver_info["sipuri"]}'
-    invite.init_mandatory()
-    invite.field('CSeq').method = invite.method
-    invite.field('CSeq').value = int.from_bytes(os.urandom(2), 'little')
+    invite = _build_request(
+        sipmsg.Invite(request_uri=request_uri if request_uri is not None else \
+            f'{receiver_info["sipuri"]}'),
+        sock_addr,
+        f'{caller_info["name"]} <{caller_info["sipuri"]}>',
+        f'{receiver_info["name"]} <{receiver_info["sipuri"]}>')
     invite.hdr_fields.append(hf.Content_Type(value='application/sdp'))
     invite.hdr_fields.append(hf.Accept(value='application/sdp'))
     invite.hdr_fields.append(hf.Allow_Events(value='presence,dialog,message-summary,refer'))
-
-    invite.field('From').value = \
-        f'{caller_info["name"]} <{caller_info["sipuri"]}>'
-    invite.field('To').value = \
-        f'{receiver_info["name"]} <{receiver_info["sipuri"]}>'
-    invite.field('Via').via_params['transport'] = 'UDP'
-    invite.field('Via').via_params['address'] = f'{sock_addr[0]}:{sock_addr[1]}'
-
     invite.body = sip_sdp(caller_info['name'], rtp_socket)
-    invite.hdr_fields.append(hf.Allow(
-        value='ACK, BYE, CANCEL, INFO, INVITE, MESSAGE, NOTIFY, OPTIONS, REFER, SUBSCRIBE, UPDATE'))
-    insert_behave_fields(header_fields, invite)
-    invite.sort()
-    return invite
+    return _finish_request(invite, header_fields)
 
 def sip_ack(sdp_msg:str, userinfo:dict, addr:tuple, req_uri=None, header_fields=None) \
         -> sipmsg.SipMessage:
@@ -138,8 +189,7 @@ def sip_ack(sdp_msg:str, userinfo:dict, addr:tuple, req_uri=None, header_fields=
     ack.hdr_fields.append(hf.Contact(
         value=f'<sip:{userinfo["extension"]}@{addr[0]}:{addr[1]}>'))
     ack.field('CSeq').method = 'ACK'
-    ack.hdr_fields.append(hf.Allow(
-        value='ACK, BYE, CANCEL, INFO, INVITE, MESSAGE, NOTIFY, OPTIONS, REFER, SUBSCRIBE, UPDATE'))
+    ack.static_tail = _ALLOW_LINE
     ack.hdr_fields.append(hf.Allow_Events(value='presence,dialog,message-summary,refer'))
     insert_behave_fields(header_fields, ack)
     ack.sort()
@@ -157,23 +207,26 @@ def sip_bye(sdp_msg:str, userinfo:dict, addr:tuple, contact:str=None,
     assert isinstance(userinfo, dict)
     assert isinstance(addr, tuple)
 
-    sdp_dict = hf.msg2fields(sdp_msg)
+    sdp_dict = hf.msg2fields_subset(sdp_msg,
+        ('Contact', 'From', 'To', 'CSeq', 'Call-ID'))
     if contact is None:
         contact = sdp_dict['Contact'].strip('<>').split(';')[0]
+    hostport = f'{addr[0]}:{addr[1]}'
     bye = sipmsg.Bye(request_uri=contact)
     bye.init_mandatory()
-    bye.field('Via').via_params['transport'] = 'udp'
-    bye.field('Via').via_params['address'] = f'{addr[0]}:{addr[1]}'
+    via = bye.field('Via')
+    via.via_params['transport'] = 'udp'
+    via.via_params['address'] = addr
     bye.field('From').from_string(sdp_dict['From'])
     bye.field('To').from_string(sdp_dict['To'])
     bye.hdr_fields.append(hf.Contact(
-        value=f'<sip:{userinfo["extension"]}@{addr[0]}:{addr[1]}>'))
-    bye.field('CSeq').from_string(sdp_dict['CSeq'])
-    bye.field('CSeq').value += 1
-    bye.field('CSeq').method = bye.method
+        value=f'<sip:{userinfo["extension"]}@{hostport}>'))
+    cseq = bye.field('CSeq')
+    cseq.from_string(sdp_dict['CSeq'])
+    cseq.value += 1
+    cseq.method = bye.method
     bye.field('Call_ID').value = sdp_dict['Call-ID']
-    bye.hdr_fields.append(hf.Allow(
-        value='ACK, BYE, CANCEL, INFO, INVITE, MESSAGE, NOTIFY, OPTIONS, REFER, SUBSCRIBE, UPDATE'))
+    bye.static_tail = _ALLOW_LINE
     insert_behave_fields(header_fields, bye)
     bye.sort()
     return bye
@@ -187,20 +240,14 @@ def sip_options(userinfo:dict, addr:tuple, header_fields=None) -> sipmsg.SipMess
     assert isinstance(userinfo, dict)
     assert isinstance(addr, tuple)
 
-    addr_contact = f'sip:{userinfo["extension"]}@{addr[0]}:{addr[1]}'
-    options = sipmsg.Options(request_uri=addr_contact, transport='UDP')
-    options.init_mandatory()
-    options.field('Via').via_params['transport'] = 'UDP'
-    options.field('Via').via_params['address'] = f'{addr[0]}:{addr[1]}'
-    options.field('CSeq').method = options.method
-    options.field('From').value = f'{userinfo["name"]} <{userinfo["sipuri"]}>'
-    options.field('To').value = f'{userinfo["name"]} <{userinfo["sipuri"]}>'
+    hostport = f'{addr[0]}:{addr[1]}'
+    user_uri = f'{userinfo["name"]} <{userinfo["sipuri"]}>'
+    addr_contact = f'sip:{userinfo["extension"]}@{hostport}'
+    options = _build_request(
+        sipmsg.Options(request_uri=addr_contact, transport='UDP'),
+        addr, user_uri, user_uri)
     options.hdr_fields.append(hf.Contact(value=addr_contact))
-    options.hdr_fields.append(hf.Allow(
-        value='ACK, BYE, CANCEL, INFO, INVITE, MESSAGE, NOTIFY, OPTIONS, REFER, SUBSCRIBE, UPDATE'))
-    insert_behave_fields(header_fields, options)
-    options.sort()
-    return options
+    return _finish_request(options, header_fields)
 
 def sip_refer(from_user:dict, to_user:str,
         sockname:tuple, refer_to:str, request_uri:str,
@@ -226,27 +273,18 @@ def sip_refer(from_user:dict, to_user:str,
     assert isinstance(refer_to, str)
     assert isinstance(request_uri, str)
 
-    refer = sipmsg.Refer(request_uri=request_uri, transport='UDP')
-    refer.init_mandatory()
-    refer.field('Via').via_params['transport'] = refer.transport
-    refer.field('Via').via_params['address'] = \
-        f'{sockname[0]}:{sockname[1]}'
-    refer.field('From').value = \
-        f'{from_user["name"]} <{from_user["sipuri"]}>'
-    refer.field('To').value = \
-        f'{to_user["name"]} <{to_user["sipuri"]}>'
-    refer.field('Contact').from_string(
-        f'<sip:{from_user["extension"]}@{sockname[0]}:{sockname[1]}>')
-    refer.field('CSeq').method = refer.method
+    hostport = f'{sockname[0]}:{sockname[1]}'
+    refer = _build_request(
+        sipmsg.Refer(request_uri=request_uri, transport='UDP'),
+        sockname,
+        f'{from_user["name"]} <{from_user["sipuri"]}>',
+        f'{to_user["name"]} <{to_user["sipuri"]}>')
+    contact_uri = f'<sip:{from_user["extension"]}@{hostport}>'
+    refer.field('Contact').from_string(contact_uri)
     refer.field('Refer_To').value = refer_to
-    refer.field('Referred_By').value = \
-        str(refer.field('Contact')).split(maxsplit=1)[-1]
+    refer.field('Referred_By').value = contact_uri
     refer.hdr_fields.append(hf.Event(value='refer'))
-    refer.hdr_fields.append(hf.Allow(
-        value='ACK, BYE, CANCEL, INFO, INVITE, MESSAGE, NOTIFY, OPTIONS, REFER, SUBSCRIBE, UPDATE'))
-    insert_behave_fields(header_fields, refer)
-    refer.sort()
-    return refer
+    return _finish_request(refer, header_fields)
 
 # pylint: disable=R0913
 def sip_subscribe(from_user:dict, to_sipuri:str, request_uri:str,
@@ -273,29 +311,21 @@ def sip_subscribe(from_user:dict, to_sipuri:str, request_uri:str,
     if expires is not None:
         assert isinstance(expires, int)
 
-    subscribe = sipmsg.Subscribe(request_uri=request_uri, transport='UDP')
-    subscribe.init_mandatory()
-
-    subscribe.field('Via').via_params['transport'] = subscribe.transport
-    subscribe.field('Via').via_params['address'] = \
-        f'{sockname[0]}:{sockname[1]}'
-    subscribe.field('From').value = f'<{from_user["sipuri"]}>'
-    subscribe.field('To').value = f'<{to_sipuri}>'
+    hostport = f'{sockname[0]}:{sockname[1]}'
+    subscribe = _build_request(
+        sipmsg.Subscribe(request_uri=request_uri, transport='UDP'),
+        sockname, f'<{from_user["sipuri"]}>', f'<{to_sipuri}>')
     subscribe.field('Contact').from_string(
-        f'<sip:{from_user["extension"]}@{sockname[0]}:{sockname[1]}>')
-    subscribe.field('CSeq').method = subscribe.method
+        f'<sip:{from_user["extension"]}@{hostport}>')
     if call_id:
         subscribe.field('Call_ID').value = call_id
     subscribe.field('Event').value = event
     if supported is not None:
-        subscribe.hdr_fields.append(hf.Supported(value=supported))
-    subscribe.hdr_fields.append(hf.Allow(
-        value='ACK, BYE, CANCEL, INFO, INVITE, MESSAGE, NOTIFY, OPTIONS, REFER, SUBSCRIBE, UPDATE'))
-    subscribe.hdr_fields.append(hf.Supported(value='eventlist, replaces, callerid'))
+        # Single Supported header, with the default option tags
+        subscribe.static_tail = _ALLOW_LINE + \
+            f'{hf.Supported(value=f"{supported}, {SUPPORTED_DEFAULT}")}\r\n'
     subscribe.hdr_fields.append(hf.Expires(value=expires))
-    insert_behave_fields(header_fields, subscribe)
-    subscribe.sort()
-    return subscribe
+    return _finish_request(subscribe, header_fields)
 
 def sip_publish(from_user:dict, request_uri:str, sockname:tuple,
         event:str, accept:str=None, supported:str=None, expires:int=None, \
@@ -323,26 +353,18 @@ def sip_publish(from_user:dict, request_uri:str, sockname:tuple,
     if expires is not None:
         assert isinstance(expires, int)
 
-    publish = sipmsg.Publish(request_uri=request_uri, transport='UDP')
-    publish.init_mandatory()
-
-    publish.field('Via').via_params['transport'] = publish.transport
-    publish.field('Via').via_params['address'] = \
-        f'{sockname[0]}:{sockname[1]}'
-    publish.field('From').value = f'<{from_user["sipuri"]}>'
-    publish.field('To').value = f'<{from_user["sipuri"]}>'
-    publish.field('CSeq').method = publish.method
+    user_uri = f'<{from_user["sipuri"]}>'
+    publish = _build_request(
+        sipmsg.Publish(request_uri=request_uri, transport='UDP'),
+        sockname, user_uri, user_uri)
     publish.field('Event').value = event
     if accept is not None:
         publish.hdr_fields.append(hf.Accept(value=accept))
     if supported is not None:
-        publish.hdr_fields.append(hf.Supported(value=supported))
-    publish.hdr_fields.append(hf.Allow(
-        value='ACK, BYE, CANCEL, INFO, INVITE, MESSAGE, NOTIFY, OPTIONS, REFER, SUBSCRIBE, UPDATE'))
-    publish.hdr_fields.append(hf.Supported(value='eventlist, replaces, callerid'))
+        # Single Supported header, with the default option tags
+        publish.static_tail = _ALLOW_LINE + \
+            f'{hf.Supported(value=f"{supported}, {SUPPORTED_DEFAULT}")}\r\n'
     if expires is not None:
         publish.hdr_fields.append(hf.Expires(value=expires))
     publish.hdr_fields.append(hf.Content_Type(value='application/pidf+xml'))
-    insert_behave_fields(header_fields, publish)
-    publish.sort()
-    return publish
+    return _finish_request(publish, header_fields)
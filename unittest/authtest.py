@@ -1,5 +1,6 @@
 # vim: set ai ts=4 sw=4 expandtab:
 
+import copy
 import logging
 import sys
 import unittest
@@ -13,7 +14,25 @@ from pysiptest.digestauth import SipDigestAuth
 # https://tools.ietf.org/html/draft-smith-sipping-auth-examples-01#section-3
 # Worked examples
 
-class TestDigestAuth(unittest.TestCase):
+# Challenges used by several tests, by algorithm
+CHALLENGES = {
+    'MD5': 'Digest realm="biloxi.com", qop="auth,auth-int", algorithm=MD5, nonce="dcd98b7102dd2f0e8b11d0f600bfb0c093", opaque="5ccc069c403ebaf9f0171e9517f40e41"',
+    'MD5-sess': 'Digest realm="biloxi.com", qop="auth,auth-int", algorithm=MD5-sess, nonce="dcd98b7102dd2f0e8b11d0f600bfb0c093", opaque="5ccc069c403ebaf9f0171e9517f40e41"'}
+
+class ParsedChallenges():
+    """ Parse each shared challenge once for the test class. """
+    @classmethod
+    def setUpClass(cls):
+        cls._parsed = {}
+        for algorithm, challenge in CHALLENGES.items():
+            cls._parsed[algorithm] = SipDigestAuth()
+            cls._parsed[algorithm].parse_challenge(challenge)
+
+    def challenged(self, algorithm):
+        """ Copy of the authenticator with the parsed challenge. """
+        return copy.deepcopy(self._parsed[algorithm])
+
+class TestDigestAuth(ParsedChallenges, unittest.TestCase):
     """ Unit tests covering worked examples in draft, section 3. """
 
     def test_NoAlgoNoQop(self):
@@ -63,9 +82,7 @@ class TestDigestAuth(unittest.TestCase):
     def test_AuthAndMD5(self):
         """ 3.3 auth and MD5 """
         bob_pwd = 'zanzibar'
-        www_authenticate = 'Digest realm="biloxi.com", qop="auth,auth-int", algorithm=MD5, nonce="dcd98b7102dd2f0e8b11d0f600bfb0c093", opaque="5ccc069c403ebaf9f0171e9517f40e41"'
-        sda = SipDigestAuth()
-        sda.parse_challenge(www_authenticate)
+        sda = self.challenged('MD5')
         sda._force_nonce = '0a4f113b'
         hdr_auth = sda.get_auth_digest('INVITE', 'sip:bob@biloxi.com', 'bob', bob_pwd)
         _, kv = hdr_auth.split(' ', 1)
@@ -86,9 +103,7 @@ class TestDigestAuth(unittest.TestCase):
     def test_AuthAndMD5Sess(self):
         """ 3.4 auth and MD5-Sess """
         bob_pwd = 'zanzibar'
-        www_authenticate = 'Digest realm="biloxi.com", qop="auth,auth-int", algorithm=MD5-sess, nonce="dcd98b7102dd2f0e8b11d0f600bfb0c093", opaque="5ccc069c403ebaf9f0171e9517f40e41"'
-        sda = SipDigestAuth()
-        sda.parse_challenge(www_authenticate)
+        sda = self.challenged('MD5-sess')
         sda._force_nonce = '0a4f113b'
         hdr_auth = sda.get_auth_digest('INVITE', 'sip:bob@biloxi.com', 'bob', bob_pwd)
         _, kv = hdr_auth.split(' ', 1)
@@ -109,9 +124,7 @@ class TestDigestAuth(unittest.TestCase):
     def test_AuthIntAndMD5(self):
         """ 3.5 auth-int and MD5 """
         bob_pwd = 'zanzibar'
-        www_authenticate = 'Digest realm="biloxi.com", qop="auth,auth-int", algorithm=MD5, nonce="dcd98b7102dd2f0e8b11d0f600bfb0c093", opaque="5ccc069c403ebaf9f0171e9517f40e41"'
-        sda = SipDigestAuth()
-        sda.parse_challenge(www_authenticate)
+        sda = self.challenged('MD5')
         sda._force_nonce = '0a4f113b'
         body_md5sum = 'c1ed018b8ec4a3b170c0921f5b564e48'
         hdr_auth = sda.get_auth_digest('INVITE', 'sip:bob@biloxi.com', 'bob', bob_pwd, body_md5sum)
@@ -133,9 +146,7 @@ class TestDigestAuth(unittest.TestCase):
     def test_AuthIntAndMD5Sess(self):
         """ 3.6 auth-int and MD5-Sess """
         bob_pwd = 'zanzibar'
-        www_authenticate = 'Digest realm="biloxi.com", qop="auth,auth-int", algorithm=MD5-sess, nonce="dcd98b7102dd2f0e8b11d0f600bfb0c093", opaque="5ccc069c403ebaf9f0171e9517f40e41"'
-        sda = SipDigestAuth()
-        sda.parse_challenge(www_authenticate)
+        sda = self.challenged('MD5-sess')
         sda._force_nonce = '0a4f113b'
         body_md5sum = 'c1ed018b8ec4a3b170c0921f5b564e48'
         hdr_auth = sda.get_auth_digest('INVITE', 'sip:bob@biloxi.com', 'bob', bob_pwd, body_md5sum)
@@ -154,15 +165,13 @@ class TestDigestAuth(unittest.TestCase):
         self.assertEqual(auth_dict['response'], '91984da2d8663716e91554859c22ca70')
         self.assertEqual(auth_dict['opaque'], '5ccc069c403ebaf9f0171e9517f40e41')
 
-class TestRepeatAuthBehavior(unittest.TestCase):
+class TestRepeatAuthBehavior(ParsedChallenges, unittest.TestCase):
     def test_auth_seq(self):
         """ Sequential auth calls should increment 'nc' and produce a new cnonce. """
         nc_values = []
         cnonce_values = []
         bob_pwd = 'zanzibar'
-        www_authenticate = 'Digest realm="biloxi.com", qop="auth,auth-int", algorithm=MD5, nonce="dcd98b7102dd2f0e8b11d0f600bfb0c093", opaque="5ccc069c403ebaf9f0171e9517f40e41"'
-        sda = SipDigestAuth()
-        sda.parse_challenge(www_authenticate)
+        sda = self.challenged('MD5')
         hdr_auth = sda.get_auth_digest('INVITE', 'sip:bob@biloxi.com', 'bob', bob_pwd)
         _, kv = hdr_auth.split(' ', 1)
         auth_dict = urllib.request.parse_keqv_list(urllib.request.parse_http_list(kv))
@@ -183,9 +192,7 @@ class TestRepeatAuthBehavior(unittest.TestCase):
         nc_values = []
         cnonce_values = []
         bob_pwd = 'zanzibar'
-        www_authenticate = 'Digest realm="biloxi.com", qop="auth,auth-int", algorithm=MD5-sess, nonce="dcd98b7102dd2f0e8b11d0f600bfb0c093", opaque="5ccc069c403ebaf9f0171e9517f40e41"'
-        sda = SipDigestAuth()
-        sda.parse_challenge(www_authenticate)
+        sda = self.challenged('MD5-sess')
         hdr_auth = sda.get_auth_digest('INVITE', 'sip:bob@biloxi.com', 'bob', bob_pwd)
         _, kv = hdr_auth.split(' ', 1)
         auth_dict = urllib.request.parse_keqv_list(urllib.request.parse_http_list(kv))
@@ -201,6 +208,18 @@ class TestRepeatAuthBehavior(unittest.TestCase):
         self.assertTrue(nc_values[0] + 1 == nc_values[1])
         self.assertEqual(cnonce_values[0], cnonce_values[1])
 
+    def test_credentials_change(self):
+        """ A new password gives a new response for the same nonce values. """
+        sda = self.challenged('MD5')
+        sda._force_nonce = '0a4f113b'
+        hdr_first = sda.get_auth_digest('INVITE', 'sip:bob@biloxi.com', 'bob', 'zanzibar')
+        sda.reset_nonce_count()
+        hdr_other = sda.get_auth_digest('INVITE', 'sip:bob@biloxi.com', 'bob', 'other')
+        sda.reset_nonce_count()
+        hdr_again = sda.get_auth_digest('INVITE', 'sip:bob@biloxi.com', 'bob', 'zanzibar')
+        self.assertNotEqual(hdr_first, hdr_other)
+        self.assertEqual(hdr_first, hdr_again)
+
     def test_RFC2617_sec3_5_example(self):
         nc_values = []
         cnonce_values = []
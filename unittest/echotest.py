@@ -0,0 +1,50 @@
+# vim: set ai ts=4 sw=4 expandtab:
+
+import asyncio
+import socket
+import unittest
+
+from pysiptest import rtpecho
+
+class TestDrainTransport(unittest.TestCase):
+    '''Unit tests for the RTP echo transport.'''
+
+    def test_drain(self):
+        async def echo():
+            loop = asyncio.get_running_loop()
+            on_con_lost = loop.create_future()
+            transport, protocol = rtpecho.create_echo_endpoint(
+                loop, ('127.0.0.1', 0), on_con_lost=on_con_lost)
+            self.assertEqual(protocol.transport, transport)
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as peer:
+                peer.bind(('127.0.0.1', 0))
+                peer.settimeout(1)
+                transport.sendto(b'echo', peer.getsockname())
+                self.assertEqual(peer.recv(16), b'echo')
+                for count in range(rtpecho.MAX_DRAIN + 8):
+                    peer.sendto(count.to_bytes(2, 'big'), protocol.local_addr)
+                while len(protocol.echo_queue) < rtpecho.MAX_DRAIN + 8:
+                    await asyncio.sleep(0.01)
+                self.assertEqual(protocol.echo_addr, peer.getsockname())
+                self.assertEqual(protocol.echo_queue[0], (0).to_bytes(2, 'big'))
+            transport.close()
+            self.assertTrue(await asyncio.wait_for(on_con_lost, 1))
+        asyncio.run(echo())
+
+    @unittest.skipUnless(socket.has_ipv6, 'IPv6 not supported')
+    def test_ipv6(self):
+        async def bind():
+            loop = asyncio.get_running_loop()
+            try:
+                transport, protocol = rtpecho.create_echo_endpoint(
+                    loop, ('::1', 0))
+            except OSError as exc:
+                self.skipTest(f'no IPv6 loopback: {exc}')
+            self.assertEqual(
+                transport.get_extra_info('socket').family, socket.AF_INET6)
+            self.assertEqual(protocol.local_addr[0], '::1')
+            transport.close()
+        asyncio.run(bind())
+
+if __name__ == '__main__':
+    unittest.main()
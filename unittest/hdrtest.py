@@ -128,6 +128,14 @@ class TestHeaderField(unittest.TestCase):
         self.assertEqual(str(o),
             "v: SIP/2.0/UDP banana.apple;branch=b1234")
 
+    def test_Via_str_address_tuple(self):
+        """ Test Via __str__ with (host, port) address. """
+        o = hf.Via()
+        o.via_params['branch'] = 'b1234'
+        o.via_params['address'] = ('192.168.0.2', 5060)
+        self.assertEqual(str(o),
+            "Via: SIP/2.0/UDP 192.168.0.2:5060;branch=b1234")
+
     def test_Contact_from_str1(self):
         '''Test Contact from_str'''
         o = hf.Contact()
@@ -185,6 +193,30 @@ class TestHeaderField(unittest.TestCase):
         s_val = str(o)
         self.assertEqual('Contact: ' + ts1, s_val)
 
+    def test_Contact_set_port(self):
+        '''Test Contact set_port'''
+        o = hf.Contact()
+        o.from_string('"Mr. Watson" <sip:watson@10.0.0.1:5060>;expires=3600')
+        o.set_port(5070)
+        self.assertEqual('Contact: "Mr. Watson" <sip:watson@10.0.0.1:5070>;expires=3600', str(o))
+        self.assertEqual('3600', o.contact_params['sip:watson@10.0.0.1:5070']['expires'])
+        o = hf.Contact()
+        o.from_string('<sip:10.0.0.1:5060>;expires=60')
+        o.set_port(5070)
+        self.assertEqual({'sip:10.0.0.1:5070': {'expires': '60'}}, o.contact_params)
+        o.from_string('<sips:10.0.0.1>')
+        o.set_port(5071)
+        self.assertEqual(['sips:10.0.0.1:5071'], list(o.contact_params))
+        o.from_string('<sip:u@[::1]:5060>')
+        o.set_port(7000)
+        self.assertEqual(['sip:u@[::1]:7000'], list(o.contact_params))
+        o.from_string('<sip:[2001:db8::1]>')
+        o.set_port(7001)
+        self.assertEqual(['sip:[2001:db8::1]:7001'], list(o.contact_params))
+        o.from_string('<sip:u@example.com>')
+        o.set_port(7002)
+        self.assertEqual(['sip:u@example.com:7002'], list(o.contact_params))
+
     def test_Content_Type(self):
         '''Test Content-Type'''
         expected = 'text/plain'
@@ -379,5 +411,35 @@ class TestHeaderField(unittest.TestCase):
         """ """
         pass
 
+class TestMsg2Fields(unittest.TestCase):
+    """ Unit tests for splitting a SIP message into fields. """
+    SIP_MSG = 'SIP/2.0 200 OK\r\n' \
+        'Via: SIP/2.0/UDP 192.168.0.1:5060;branch=z9hG4bK1234\r\n' \
+        'From: <sip:2006@teo>;tag=1234\r\n' \
+        'To: <sip:2007@teo>;tag=5678\r\n' \
+        'Call-ID: 31415926\r\n' \
+        'CSeq: 2 INVITE\r\n' \
+        'Contact: <sip:2007@192.168.0.2:5060>\r\n' \
+        'Content-Length: 0\r\n' \
+        '\r\n'
+
+    def test_msg2fields_subset(self):
+        """ Only the wanted fields are returned. """
+        fields = hf.msg2fields_subset(self.SIP_MSG, ('Call-ID', 'CSeq', 'To'))
+        self.assertEqual(fields,
+            {'Call-ID': '31415926', 'CSeq': '2 INVITE', 'To': '<sip:2007@teo>;tag=5678'})
+
+    def test_msg2fields_subset_matches_msg2fields(self):
+        """ Subset values are the same as the full split. """
+        full = hf.msg2fields(self.SIP_MSG)
+        names = ('Via', 'From', 'Contact', 'Content-Length')
+        fields = hf.msg2fields_subset(self.SIP_MSG, names)
+        self.assertEqual(fields, {n: full[n] for n in names})
+
+    def test_msg2fields_subset_missing(self):
+        """ Fields not in the message are not returned. """
+        fields = hf.msg2fields_subset(self.SIP_MSG, ('Call-ID', 'Event'))
+        self.assertEqual(fields, {'Call-ID': '31415926'})
+
 if __name__ == '__main__':
     unittest.main()
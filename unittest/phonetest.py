@@ -0,0 +1,160 @@
+# vim: set ai ts=4 sw=4 expandtab:
+
+import asyncio
+import unittest
+
+from pysiptest.sipphone import AutoReply, MessageHistory, MessageQueue, \
+    SipPhoneUdpClient
+from pysiptest import support
+
+class TestMessageHistory(unittest.TestCase):
+    '''Unit tests for indexed message history.'''
+
+    def test_last_matching(self):
+        history = MessageHistory(4)
+        history.add('INVITE', 'i1')
+        history.add('200', 'ok1')
+        history.add('INVITE', 'i2')
+        self.assertEqual(history.last('INVITE'), 'i2')
+        self.assertEqual(history.matching('INVITE'), ['i1', 'i2'])
+        self.assertIsNone(history.last('BYE'))
+        self.assertEqual(history.matching('BYE'), [])
+
+    def test_eviction(self):
+        history = MessageHistory(3)
+        for msg in ('i1', 'ok1', 'i2', 'bye1', 'ok2'):
+            history.add(msg[:-1], msg)
+        # i1 and ok1 dropped, oldest first
+        self.assertEqual(list(history), ['i2', 'bye1', 'ok2'])
+        self.assertEqual(history.matching('i'), ['i2'])
+        self.assertEqual(history.last('ok'), 'ok2')
+        self.assertEqual(history.matching('ok'), ['ok2'])
+        history.add('x', 'x1')
+        history.add('x', 'x2')
+        self.assertIsNone(history.last('i'))
+        self.assertEqual(history.matching('i'), [])
+        self.assertEqual(history.last('ok'), 'ok2')
+        self.assertEqual(history.matching('x'), ['x1', 'x2'])
+
+    def test_unbounded(self):
+        history = MessageHistory(None)
+        for count in range(100):
+            history.add('OPTIONS', count)
+        self.assertEqual(len(history), 100)
+        self.assertEqual(history.last('OPTIONS'), 99)
+        self.assertEqual(history.matching('OPTIONS'), list(range(100)))
+
+class TestMessageQueue(unittest.TestCase):
+    '''Unit tests for the received message queue.'''
+
+    def test_nowait(self):
+        queue = MessageQueue()
+        self.assertTrue(queue.empty())
+        self.assertRaises(asyncio.QueueEmpty, queue.get_nowait)
+        queue.put_nowait('a')
+        queue.put_nowait('b')
+        self.assertFalse(queue.empty())
+        self.assertEqual(queue.qsize(), 2)
+        self.assertEqual(queue.get_nowait(), 'a')
+        self.assertEqual(queue.get_nowait(), 'b')
+        self.assertTrue(queue.empty())
+        self.assertEqual(queue.qsize(), 0)
+        self.assertRaises(asyncio.QueueEmpty, queue.get_nowait)
+
+    def test_get_wakes(self):
+        async def consume():
+            queue = MessageQueue()
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.sleep(0)
+            self.assertFalse(getter.done())
+            asyncio.get_running_loop().call_soon(queue.put_nowait, 'a')
+            self.assertEqual(await asyncio.wait_for(getter, 1), 'a')
+            # Already queued, returned without waiting
+            queue.put_nowait('b')
+            self.assertEqual(await queue.get(), 'b')
+            self.assertTrue(queue.empty())
+        asyncio.run(consume())
+
+class TestDrainAtLeast(unittest.TestCase):
+    '''Unit tests for draining the received message queue.'''
+
+    def test_drain(self):
+        async def drain():
+            queue = MessageQueue()
+            for msg in 'abcde':
+                queue.put_nowait(msg)
+            self.assertEqual(await support.drain_at_least(queue, 2), ['a', 'b'])
+            self.assertEqual(await support.drain_at_least(queue), ['c', 'd', 'e'])
+            self.assertTrue(queue.empty())
+            # Fewer queued than count, returns those without waiting
+            queue.put_nowait('f')
+            self.assertEqual(await support.drain_at_least(queue, 4), ['f'])
+            # Empty, waits for one
+            asyncio.get_running_loop().call_soon(queue.put_nowait, 'g')
+            self.assertEqual(
+                await asyncio.wait_for(support.drain_at_least(queue), 1), ['g'])
+        asyncio.run(drain())
+
+class TestSipPhoneUdpClient(unittest.TestCase):
+    '''Unit tests for received message handling.'''
+
+    def test_append_rcvd(self):
+        phone = SipPhoneUdpClient(history_len=2)
+        invite = 'INVITE sip:2007@teo SIP/2.0\r\nCall-ID: a\r\nContent-Length: 0\r\n\r\n'
+        ok = 'SIP/2.0 200 OK\r\nCall-ID: b\r\nContent-Length: 0\r\n\r\n'
+        bye = 'BYE sip:2007@teo SIP/2.0\r\nCall-ID: c\r\nContent-Length: 0\r\n\r\n'
+        phone.append_rcvd(invite)
+        phone.append_rcvd(ok)
+        self.assertIs(phone.get_prev_rcvd('INVITE'), invite)
+        self.assertIs(phone.get_prev_rcvd('200'), ok)
+        fields = phone.fields_of(invite)
+        self.assertIs(phone.fields_of(invite), fields)
+        self.assertEqual(fields.getfield('Call-ID'), ['a'])
+        # Evicting the INVITE drops its parsed fields
+        phone.append_rcvd(bye)
+        self.assertIsNone(phone.get_prev_rcvd('INVITE'))
+        self.assertEqual(phone.get_rcvd('BYE'), [bye])
+        self.assertNotIn(id(invite), phone._fields_cache)
+
+class StubTransport():
+    '''Datagram transport, keeping sent datagrams.'''
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data):
+        self.sent.append(data)
+
+class TestAutoReply(unittest.TestCase):
+    '''Unit tests for automatic replies.'''
+
+    OPTIONS = 'OPTIONS sip:2007@teo SIP/2.0\r\n' \
+        'Via: SIP/2.0/UDP 10.0.0.1:5060;branch=z9hG4bK{}\r\n' \
+        'From: <sip:2006@teo>;tag=1234\r\n' \
+        'To: <sip:2007@teo>\r\n' \
+        'Call-ID: abc-123\r\n' \
+        'CSeq: 7 OPTIONS\r\n' \
+        'Content-Length: 0\r\n\r\n'
+
+    def test_retransmission(self):
+        phone = AutoReply(user_info={}, loop=None)
+        phone.transport = StubTransport()
+        template = phone._templates['OPTIONS']
+        call_id = template.field('Call_ID').value
+        branch = template.field('Via').via_params['branch']
+        request = self.OPTIONS.format('first').encode()
+        phone.datagram_received(request, None)
+        phone.datagram_received(request, None)
+        self.assertEqual(len(phone.transport.sent), 2)
+        self.assertEqual(phone.transport.sent[0], phone.transport.sent[1])
+        self.assertIn(b'SIP/2.0 200 OK\r\n', phone.transport.sent[0])
+        self.assertIn(b';branch=z9hG4bKfirst', phone.transport.sent[0])
+        self.assertEqual(len(phone.get_rcvd('OPTIONS')), 2)
+        # New transaction, replied from a fresh clone of the template
+        phone.datagram_received(self.OPTIONS.format('second').encode(), None)
+        self.assertIn(b';branch=z9hG4bKsecond', phone.transport.sent[2])
+        self.assertNotIn(b'z9hG4bKfirst', phone.transport.sent[2])
+        self.assertEqual(template.field('Call_ID').value, call_id)
+        self.assertEqual(template.field('Via').via_params['branch'], branch)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,12 +5,112 @@ import unittest
 
 import pysiptest.headerfield as hf
 import pysiptest.sipmsg as sipmsg
+from pysiptest import support
 
 class TestSipMessage(unittest.TestCase):
     '''Unit tests for sipmsg classes.'''
 
     def test_field(self):
-        pass
+        msg = sipmsg.Register()
+        msg.init_mandatory()
+        self.assertIs(msg.field('Call-ID'), msg.field('Call_ID'))
+        self.assertIsNone(msg.field('Authorization'))
+        msg.hdr_fields.append(hf.Authorization(value='Digest x'))
+        self.assertIsNotNone(msg.field('Authorization'))
+        msg.hdr_fields.remove(msg.field('Authorization'))
+        self.assertIsNone(msg.field('Authorization'))
+
+    def test_clone(self):
+        msg = sipmsg.Register()
+        msg.init_mandatory()
+        msg.field('Via').via_params['address'] = ('10.0.0.1', 5060)
+        msg.field('CSeq').method = msg.method
+        new_msg = msg.clone()
+        self.assertEqual(str(new_msg), str(msg))
+        self.assertIsNot(new_msg.field('Via'), msg.field('Via'))
+        new_msg.field('Via').via_params['branch'] = 'z9hG4bKclone'
+        new_msg.hdr_fields.append(hf.Authorization(value='Digest x'))
+        self.assertNotEqual(msg.field('Via').via_params['branch'], 'z9hG4bKclone')
+        self.assertIsNone(msg.field('Authorization'))
+
+    def test_sort_on_str(self):
+        msg = sipmsg.Register()
+        msg.init_mandatory()
+        msg.field('Via').via_params['address'] = ('10.0.0.1', 5060)
+        msg.field('CSeq').method = msg.method
+        msg.sort()
+        self.assertTrue(msg.hdr_fields.in_order)
+        msg.hdr_fields.insert(0, hf.Content_Length(value=0))
+        self.assertFalse(msg.hdr_fields.in_order)
+        self.assertTrue(str(msg).split('\r\n')[1].startswith('Via:'))
+        self.assertTrue(msg.hdr_fields.in_order)
+
+    def test_init_from_bytes(self):
+        request = 'OPTIONS sip:2007@teo SIP/2.0\r\n' \
+            'Via: SIP/2.0/UDP 10.0.0.1:5060;branch=z9hG4bKabc\r\n' \
+            'From: "Jos\u00e9" <sip:2006@teo>;tag=1234\r\n' \
+            'To: <sip:2007@teo>\r\n' \
+            'Call-ID: abc-123\r\n' \
+            'CSeq: 7 OPTIONS\r\n' \
+            'Content-Length: 0\r\n\r\n'
+        from_str = sipmsg.Response(status_code=200, reason_phrase='OK')
+        from_str.method = 'OPTIONS'
+        from_str.init_from_msg(request)
+        from_bytes = sipmsg.Response(status_code=200, reason_phrase='OK')
+        from_bytes.method = 'OPTIONS'
+        from_bytes.init_from_bytes(request.encode())
+        self.assertEqual(str(from_bytes), str(from_str))
+        self.assertEqual(from_bytes.field('Call_ID').value, 'abc-123')
+        self.assertIn('"Jos\u00e9"', str(from_bytes.field('From')))
+
+    def test_upsert_field(self):
+        msg = sipmsg.Register()
+        msg.init_mandatory()
+        field = msg.upsert_field('User-Agent', 'pysip')
+        self.assertIs(msg.field('User-Agent'), field)
+        self.assertIs(msg.upsert_field('User-Agent', 'other'), field)
+        self.assertEqual(field.value, 'other')
+
+    def test_field_from_static_tail(self):
+        msg = sipmsg.Register()
+        msg.init_mandatory()
+        msg.field('Via').via_params['address'] = ('10.0.0.1', 5060)
+        msg.field('CSeq').method = msg.method
+        self.assertIsNone(msg.field('Allow'))
+        msg.static_tail = 'Allow: INVITE, ACK\r\nSupported: replaces\r\n'
+        msg.upsert_field('Allow', 'INVITE')
+        self.assertEqual(str(msg).count('Allow:'), 1)
+        self.assertEqual(msg.static_tail, 'Supported: replaces\r\n')
+        msg.hdr_fields.remove(msg.field('Supported'))
+        self.assertNotIn('Supported:', str(msg))
+
+    def test_field_allow_with_allow_events(self):
+        alice = {'name': 'Alice', 'extension': '2006', 'domain': 'teo',
+            'sipuri': 'sip:2006@teo'}
+        bob = {'name': 'Bob', 'extension': '2007', 'domain': 'teo',
+            'sipuri': 'sip:2007@teo'}
+        invite = support.sip_invite(('10.0.0.1', 5060), alice, bob,
+            ('10.0.0.1', 4000), header_fields={'Allow': 'INVITE, ACK'})
+        invite_str = str(support.sip_invite(('10.0.0.1', 5060), alice, bob,
+            ('10.0.0.1', 4000)))
+        self.assertIn('\r\nAllow: ', invite_str)
+        last_line = invite_str.split('\r\n\r\n')[0].splitlines()[-1]
+        self.assertTrue(last_line.startswith('Content-Length:'))
+        allow_events = invite.field('Allow-Events').value
+        self.assertEqual(invite.field('Allow').value, 'INVITE, ACK')
+        self.assertEqual(str(invite).count('Allow:'), 1)
+        invite.hdr_fields.remove(invite.field('Allow'))
+        self.assertNotIn('Allow:', str(invite))
+        self.assertIn(f'Allow-Events: {allow_events}\r\n', str(invite))
+
+    def test_first_line(self):
+        self.assertEqual(
+            sipmsg.SipMessage.first_line('SIP/2.0 407 Proxy Authentication Required\r\n'),
+            ('SIP/2.0', '407', 'Proxy Authentication Required'))
+        self.assertEqual(
+            sipmsg.SipMessage.first_line('BYE sip:2007@teo SIP/2.0\r\nVia: x\r\n'),
+            ('BYE', 'sip:2007@teo', 'SIP/2.0'))
+        self.assertIsNone(sipmsg.SipMessage.first_line('\r\n'))
 
     def test_init_valid(self):
         pass